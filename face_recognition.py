@@ -9,22 +9,79 @@ import numpy as np
 import yaml
 import os
 import json
+import shutil
+import hashlib
+import subprocess
 import time
 import uuid
 import logging
 import threading
 import queue
-import pyttsx3
 import psutil
 import signal
 import sys
+import ctypes
+import fcntl
+import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
-from PIL import Image
-from cryptography.fernet import Fernet
 import face_recognition  # Import the module directly
 
+try:
+    import numba  # Optional: JIT-compiled distance kernel
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit('f4[::1](f4[:, ::1], f4[::1])', parallel=True, fastmath=True, cache=True)
+    def _sq_eucl_batch(M, q):
+        """Squared euclidean distance from q to every row of M"""
+        n, d = M.shape
+        out = np.empty(n, np.float32)
+        for i in numba.prange(n):
+            s = np.float32(0)
+            for j in range(d):
+                diff = M[i, j] - q[j]
+                s += diff * diff
+            out[i] = s
+        return out
+    
+    @numba.njit('Tuple((i8, f4))(f4[:, ::1], f4[::1])', fastmath=True, cache=True,
+                boundscheck=False)
+    def _nearest(M, q):
+        """Index and squared distance of the row of M nearest to q, in one pass"""
+        best_i = -1
+        best_d = np.float32(np.inf)
+        n, d = M.shape
+        for i in range(n):
+            s = np.float32(0)
+            for j in range(d):
+                diff = M[i, j] - q[j]
+                s += diff * diff
+            if s < best_d:
+                best_d = s
+                best_i = i
+        return best_i, best_d
+    
+    @numba.njit('Tuple((i8, i8))(i1[:, ::1], i1[::1])', parallel=True, cache=True)
+    def _best_dot_i8(M, q):
+        """Index and int32-accumulated dot product of the int8 row most similar to q"""
+        n, d = M.shape
+        scores = np.empty(n, np.int32)
+        for i in numba.prange(n):
+            s = np.int32(0)
+            for j in range(d):
+                s += np.int32(M[i, j]) * np.int32(q[j])
+            scores[i] = s
+        best_i = np.argmax(scores)
+        return best_i, np.int64(scores[best_i])
+
+# Below this many known faces, a serial JIT scan beats parallel dispatch
+SMALL_GALLERY = 32
+
 class FacialRecognitionSystem:
     def __init__(self):
         """Initialize system components and configuration"""
@@ -70,18 +127,49 @@ class FacialRecognitionSystem:
     
     def initialize_components(self):
         """Initialize core system components and state variables"""
+        # Headless mode skips the OpenCV window and reads keys from stdin;
+        # it is implied when there is no display server to draw on
+        no_display = (sys.platform.startswith('linux')
+                      and not os.environ.get('DISPLAY')
+                      and not os.environ.get('WAYLAND_DISPLAY'))
+        self.headless = (bool(self.config.get('display', {}).get('headless'))
+                         or '--headless' in sys.argv
+                         or no_display)
+        self.key_q = queue.Queue()
+        
         self.setup_storage()
         self.setup_camera()
         self.setup_audio()
-        self.setup_face_recognition()
         self.setup_encryption()
+        self.setup_face_recognition()
+        self.lock_memory()
         
         # Initialize state variables
         self.running = True
         self.show_stats = False
-        self.frame_times = []
+        self.frame_times = deque(maxlen=30)  # Oldest entries evicted in O(1)
+        self.process = psutil.Process()
+        self.last_stats = (0.0, 0.0)  # (CPU %, RSS MB), refreshed by stats_loop
         self.last_greeting_time = {}
-        self.unknown_face_counters = {}
+        self.greeting_cooldown = self.config['greeting']['cooldown']
+        self.unknown_face_counters = OrderedDict()  # face_key -> [count, last_seen]
+        self.recent_unknown_encodings = deque(maxlen=16)  # Recently saved unknown faces
+        self.last_counter_prune = 0.0
+        self.reload_requested = False
+        self.frame_idx = 0
+        self.small_bgr_buf = None
+        self.small_rgb_buf = None
+        self.trackers = []
+        self.tracked_names = []
+        
+        # Single-slot queues between capture, detection and display stages;
+        # stale frames are dropped rather than queued to keep latency low
+        self.capture_q = queue.Queue(maxsize=1)
+        self.result_q = queue.Queue(maxsize=1)
+        
+        # Full-size frame buffers handed back once no stage holds them, so
+        # USB capture reads into existing memory instead of allocating
+        self.frame_pool = queue.Queue(maxsize=4)
     
     def setup_storage(self):
         """Set up storage directories"""
@@ -93,24 +181,42 @@ class FacialRecognitionSystem:
             dir_path = Path(storage_config[dir_name])
             dir_path.mkdir(parents=True, exist_ok=True)
             setattr(self, dir_name, dir_path)
+        
+        # Cached known-face encodings, keyed by source image file
+        self.encodings_cache = self.base_dir / 'encodings.npz'
+        
+        # Pre-rendered greeting audio
+        self.tts_cache_dir = self.base_dir / 'tts_cache'
+        self.tts_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.greeting_wavs = {}
+        
+        # Unknown-face images and encodings are written off the detection thread
+        self.save_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='face-save')
     
     def setup_camera(self):
         """Initialize camera with support for both USB webcam and Arducam IMX519"""
         self.using_picamera = self.config['camera']['type'] == 'picamera'
+        self.picamera_yuv = False
         
         if self.using_picamera:
             try:
                 self.logger.info("Initializing Picamera2 for Arducam IMX519...")
+                from picamera2 import Picamera2
+                from libcamera import controls
                 self.camera = Picamera2()
                 
                 # Configure camera for IMX519
                 sensor_mode = self.config['camera']['sensor_mode']
                 resolution = self.config['recognition']['resolution']
                 
-                # Create a camera configuration
-                config = self.camera.create_still_configuration(
-                    main={"size": resolution},
-                    raw={"size": resolution},
+                # Create a camera configuration. libcamera's "RGB888" is laid out
+                # as B, G, R in memory, so frames arrive ready for OpenCV;
+                # "YUV420" halves the bytes moved per frame and is converted
+                # to BGR in get_frame.
+                self.picamera_yuv = self.config['camera'].get('picamera_format', 'RGB888') == 'YUV420'
+                config = self.camera.create_video_configuration(
+                    main={"size": resolution,
+                          "format": "YUV420" if self.picamera_yuv else "RGB888"},
                     controls={
                         "FrameDurationLimits": (33333, 33333),  # For 30fps
                         "AnalogueGain": 1.0,
@@ -162,8 +268,9 @@ class FacialRecognitionSystem:
                             self.camera.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)
                             
                             # Create window
-                            cv2.namedWindow('Facial Recognition System', cv2.WINDOW_NORMAL)
-                            cv2.moveWindow('Facial Recognition System', 0, 0)
+                            if not self.headless:
+                                cv2.namedWindow('Facial Recognition System', cv2.WINDOW_NORMAL)
+                                cv2.moveWindow('Facial Recognition System', 0, 0)
                             return
                         else:
                             self.logger.warning(f"Could not read frame from {device}")
@@ -185,9 +292,13 @@ class FacialRecognitionSystem:
         """Initialize text-to-speech synthesis engine"""
         if self.config['greeting']['enabled']:
             try:
+                import pyttsx3
                 self.tts_engine = pyttsx3.init()
                 self.tts_engine.setProperty('rate', self.config['greeting']['rate'])
                 self.tts_engine.setProperty('volume', self.config['greeting']['volume'])
+                # pyttsx3 engines are not thread-safe; pre-rendering and live
+                # synthesis can run from different threads
+                self.tts_lock = threading.Lock()
                 self.tts_queue = queue.Queue()
                 self.tts_thread = threading.Thread(
                     target=self.process_tts_queue, 
@@ -203,12 +314,129 @@ class FacialRecognitionSystem:
         """Initialize face detection and recognition components"""
         self.known_face_encodings = []
         self.known_face_names = []
+        self.known_encodings_matrix = np.empty((0, 128), dtype=np.float32)
+        self.known_norms_sq = np.empty(0, dtype=np.float32)
+        self.id_cache = {}  # face_key -> (name, encoding, last_seen)
+        self.last_id_cache_prune = 0.0
+        self.recent_known = []  # (location, name, last_seen) of recently recognized faces
+        self.setup_face_detector()
+        self.setup_face_encoder()
+        if self.encoder_backend == 'dlib':
+            self.log_dlib_build()
         self.load_known_faces()
     
+    def setup_face_detector(self):
+        """Load the OpenCV DNN or YuNet face detector if configured, else use dlib"""
+        recognition_config = self.config['recognition']
+        self.detector = recognition_config.get('detector', 'dlib')
+        if self.detector not in ('dnn', 'yunet'):
+            return
+        try:
+            if self.detector == 'yunet':
+                # Input size is set per frame in detect_faces
+                self.face_net = cv2.FaceDetectorYN.create(
+                    recognition_config['yunet_model'], '', (320, 320),
+                    score_threshold=recognition_config.get('dnn_confidence', 0.6),
+                    nms_threshold=0.3,
+                    top_k=50
+                )
+                self.yunet_input_size = None
+                self.logger.info("Using OpenCV YuNet face detector")
+                return
+            self.face_net = cv2.dnn.readNetFromCaffe(
+                recognition_config['dnn_prototxt'],
+                recognition_config['dnn_model']
+            )
+            self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.logger.info("Using OpenCV DNN face detector")
+        except Exception as e:
+            self.logger.error(f"Failed to load {self.detector} face detector: {e}")
+            self.logger.warning("Falling back to dlib face detector...")
+            self.detector = 'dlib'
+    
+    def setup_face_encoder(self):
+        """Load an ONNX Runtime face embedding model if configured, else use dlib"""
+        recognition_config = self.config['recognition']
+        self.encoder_backend = recognition_config.get('encoder_backend', 'dlib')
+        if self.encoder_backend != 'onnx':
+            return
+        try:
+            import onnxruntime as ort
+            # Prefer accelerators that this onnxruntime build actually ships
+            available = ort.get_available_providers()
+            providers = [p for p in recognition_config.get(
+                'onnx_providers', ['CUDAExecutionProvider', 'CPUExecutionProvider']
+            ) if p in available] or ['CPUExecutionProvider']
+            self.encoder_session = ort.InferenceSession(
+                recognition_config['onnx_encoder_model'], providers=providers
+            )
+            encoder_input = self.encoder_session.get_inputs()[0]
+            self.encoder_input_name = encoder_input.name
+            # Exports differ in layout: find the 3-channel axis, then the
+            # spatial size, which must be fixed for the chips to be resized
+            shape = list(encoder_input.shape)
+            if len(shape) == 4 and shape[1] == 3:
+                self.encoder_nchw, height, width = True, shape[2], shape[3]
+            elif len(shape) == 4 and shape[3] == 3:
+                self.encoder_nchw, height, width = False, shape[1], shape[2]
+            else:
+                raise ValueError(f"expected an NCHW or NHWC input with 3 channels, got shape {shape}")
+            if not isinstance(height, int) or not isinstance(width, int):
+                raise ValueError(f"input size must be fixed, got dynamic dimensions in shape {shape}")
+            self.encoder_input_size = (width, height)
+            self.logger.info(f"Using ONNX face encoder on {self.encoder_session.get_providers()}")
+        except Exception as e:
+            self.logger.error(f"Failed to load ONNX face encoder: {e}")
+            self.logger.warning("Falling back to dlib face encoder...")
+            self.encoder_backend = 'dlib'
+    
+    def log_dlib_build(self):
+        """Report dlib GPU support and warn if face encoding is unexpectedly slow"""
+        try:
+            import dlib
+            if dlib.DLIB_USE_CUDA and dlib.cuda.get_num_devices() > 0:
+                self.logger.info(f"dlib CUDA active ({dlib.cuda.get_num_devices()} device(s))")
+            else:
+                self.logger.info("dlib running on CPU (built without CUDA or no GPU found)")
+            
+            # SIMD/BLAS flags are exposed by dlib builds that report them
+            build_flags = {
+                flag: getattr(dlib, flag)
+                for flag in ('USE_NEON_INSTRUCTIONS', 'USE_AVX_INSTRUCTIONS',
+                             'USE_SSE4_INSTRUCTIONS', 'DLIB_USE_BLAS')
+                if hasattr(dlib, flag)
+            }
+            if build_flags:
+                self.logger.info(f"dlib build: {build_flags}")
+                if not any(build_flags.values()):
+                    self.logger.warning(
+                        "dlib was built without SIMD or BLAS support; rebuild it with install.sh"
+                    )
+        except Exception as e:
+            self.logger.warning(f"Could not query dlib build: {e}")
+        
+        # Time one encoding of a blank face chip to catch unoptimized builds
+        try:
+            blank = np.zeros((150, 150, 3), dtype=np.uint8)
+            face_recognition.face_encodings(blank, [(0, 150, 150, 0)])
+            start = time.time()
+            face_recognition.face_encodings(blank, [(0, 150, 150, 0)])
+            elapsed_ms = (time.time() - start) * 1000
+            self.logger.info(f"dlib face encoding takes {elapsed_ms:.0f}ms")
+            if elapsed_ms > self.config['performance'].get('encoding_warn_ms', 500):
+                self.logger.warning(
+                    "dlib face encoding is slow; rebuild dlib with install.sh "
+                    "to enable NEON and OpenBLAS"
+                )
+        except Exception as e:
+            self.logger.warning(f"Could not benchmark dlib: {e}")
+    
     def setup_encryption(self):
         """Configure face data encryption if enabled"""
         if self.config['security']['encrypt_faces']:
             try:
+                from cryptography.fernet import Fernet
                 key_file = self.base_dir / 'encryption.key'
                 if key_file.exists():
                     with open(key_file, 'rb') as f:
@@ -223,6 +451,30 @@ class FacialRecognitionSystem:
                 self.logger.error(f"Failed to initialize encryption: {e}")
                 self.config['security']['encrypt_faces'] = False
     
+    def lock_memory(self):
+        """Optionally mlock all pages so dlib's model weights are never paged out"""
+        if not self.config['performance'].get('lock_memory', False):
+            return
+        try:
+            libc = ctypes.CDLL('libc.so.6', use_errno=True)
+            if libc.mlockall(3) != 0:  # MCL_CURRENT | MCL_FUTURE
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            self.logger.info("Process memory locked")
+        except Exception as e:
+            self.logger.warning(f"Could not lock memory: {e}")
+    
+    def pin_detection_thread(self):
+        """Pin the calling (detection) thread to the configured CPU cores"""
+        cores = self.config['performance'].get('detection_cores')
+        if not cores or not hasattr(os, 'sched_setaffinity'):
+            return
+        try:
+            # pid 0 applies to the calling thread on Linux
+            os.sched_setaffinity(0, set(cores))
+            self.logger.info(f"Detection thread pinned to cores {sorted(cores)}")
+        except Exception as e:
+            self.logger.warning(f"Could not set detection thread affinity: {e}")
+    
     def setup_signal_handlers(self):
         """Set up signal handlers for graceful shutdown"""
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -236,29 +488,194 @@ class FacialRecognitionSystem:
     def load_known_faces(self):
         """Load known faces from storage"""
         self.logger.info("Loading known faces...")
+        self.known_face_encodings = []
+        self.known_face_names = []
+        self.id_cache = {}
+        self.recent_known = []
+        cache = self.load_encodings_cache()
+        cache_names, cache_encs, cache_mtimes, cache_sizes = [], [], [], []
+        cache_stale = False
         try:
             for face_file in self.known_faces_dir.glob('*.*'):
                 if face_file.suffix.lower() in ('.png', '.jpg', '.jpeg'):
                     name = face_file.stem
-                    self.logger.debug(f"Loading face for: {name}")
-                    
-                    # Load and process face
-                    image = face_recognition.load_image_file(str(face_file))
-                    encodings = face_recognition.face_encodings(image)
+                    stat = face_file.stat()
                     
-                    if encodings:
-                        face_encoding = encodings[0]
-                        if self.config['security']['encrypt_faces']:
-                            face_encoding = self.encrypt_encoding(face_encoding)
-                        self.known_face_encodings.append(face_encoding)
-                        self.known_face_names.append(name)
-                        self.logger.debug(f"Successfully loaded face for: {name}")
+                    cached = cache.get(face_file.name)
+                    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                        face_encoding = cached[2]
                     else:
-                        self.logger.warning(f"No face found in {face_file}")
+                        cache_stale = True
+                        self.logger.debug(f"Loading face for: {name}")
+                        
+                        # Load and process face
+                        image = face_recognition.load_image_file(str(face_file))
+                        if self.encoder_backend == 'onnx':
+                            encodings = self.encode_faces_onnx(
+                                image, face_recognition.face_locations(image)[:1], bgr=False
+                            )
+                        else:
+                            encodings = face_recognition.face_encodings(image)
+                        face_encoding = encodings[0] if encodings else None
+                        if face_encoding is None:
+                            self.logger.warning(f"No face found in {face_file}")
+                    
+                    # Faceless images are cached too, so an unchanged one is
+                    # not run through detection again on every load
+                    cache_names.append(face_file.name)
+                    cache_encs.append(face_encoding)
+                    cache_mtimes.append(stat.st_mtime_ns)
+                    cache_sizes.append(stat.st_size)
+                    if face_encoding is None:
+                        continue
+                    
+                    self.known_face_encodings.append(face_encoding)
+                    self.known_face_names.append(name)
+                    self.logger.debug(f"Successfully loaded face for: {name}")
             
+            # Only rewrite the cache when an image was added, changed or removed
+            if cache_stale or set(cache_names) != set(cache):
+                self.save_encodings_cache(cache_names, cache_encs, cache_mtimes, cache_sizes)
             self.logger.info(f"Loaded {len(self.known_face_names)} known faces")
         except Exception as e:
             self.logger.error(f"Error loading known faces: {e}")
+        
+        self.build_encodings_matrix()
+        self.greetings_map = {name: self.greeting_for(name) for name in self.known_face_names}
+        self.prerender_greetings()
+    
+    def greeting_for(self, name):
+        """Return the custom greeting for name, or the default one"""
+        return self.config['greeting']['custom_greetings'].get(name, f"Hello {name}!")
+    
+    def prerender_greetings(self):
+        """Synthesize each known person's greeting to a WAV file once"""
+        if not self.config['greeting']['enabled']:
+            return
+        if not shutil.which('aplay'):
+            self.logger.debug("aplay not found, greetings will be synthesized live")
+            return
+        espeak = shutil.which('espeak-ng') or shutil.which('espeak')
+        
+        rate = self.config['greeting']['rate']
+        amplitude = int(self.config['greeting']['volume'] * 100)
+        for name, greeting in self.greetings_map.items():
+            key = hashlib.sha1(f"{rate}:{amplitude}:{greeting}".encode()).hexdigest()[:16]
+            wav_path = self.tts_cache_dir / f"{key}.wav"
+            if not wav_path.exists():
+                try:
+                    if espeak:
+                        subprocess.run(
+                            [espeak, '-s', str(rate), '-a', str(amplitude),
+                             '-w', str(wav_path), greeting],
+                            check=True, capture_output=True, timeout=30
+                        )
+                    else:
+                        # No espeak CLI: let the pyttsx3 engine render the file once
+                        with self.tts_lock:
+                            self.tts_engine.save_to_file(greeting, str(wav_path))
+                            self.tts_engine.runAndWait()
+                    if not wav_path.exists():
+                        continue
+                except Exception as e:
+                    self.logger.warning(f"Could not pre-render greeting for {name}: {e}")
+                    continue
+            self.greeting_wavs[greeting] = wav_path
+    
+    def load_encodings_cache(self):
+        """Load cached encodings as {filename: (mtime_ns, size, encoding)}, None if faceless"""
+        if not self.encodings_cache.exists():
+            return {}
+        try:
+            with np.load(self.encodings_cache) as data:
+                encrypted = bool(data['encrypted']) if 'encrypted' in data else False
+                if encrypted != self.config['security']['encrypt_faces']:
+                    return {}
+                # Encodings from different models are not comparable
+                backend = str(data['backend']) if 'backend' in data else 'dlib'
+                if backend != self.encoder_backend:
+                    return {}
+                encs = data['encs']
+                if encrypted:
+                    encs = [self.decrypt_encoding(bytes(token)) for token in encs]
+                return {
+                    str(name): (int(mtime), int(size), None if np.isnan(enc).any() else enc)
+                    for name, mtime, size, enc in zip(
+                        data['names'], data['mtimes'], data['sizes'], encs
+                    )
+                }
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable encodings cache: {e}")
+            return {}
+    
+    def save_encodings_cache(self, names, encs, mtimes, sizes):
+        """Persist known-face encodings so unchanged images are not re-encoded"""
+        try:
+            # Images without a face are stored as a NaN row of the same width
+            dim = next((len(enc) for enc in encs if enc is not None), 128)
+            encs = [np.full(dim, np.nan) if enc is None else enc for enc in encs]
+            encrypted = self.config['security']['encrypt_faces']
+            if encrypted:
+                encs = np.array([self.encrypt_encoding(enc) for enc in encs], dtype=bytes)
+            else:
+                encs = np.stack(encs) if encs else np.empty((0, 128))
+            # manage_faces.py updates the same cache; share its lock and swap
+            # the file in whole so neither writer installs a partial cache
+            lock_path = self.encodings_cache.with_name(self.encodings_cache.name + '.lock')
+            with open(lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                fd, tmp_path = tempfile.mkstemp(dir=self.encodings_cache.parent, suffix='.npz.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        np.savez(
+                            f,
+                            names=np.array(names, dtype=str),
+                            encs=encs,
+                            encrypted=np.array(encrypted),
+                            backend=np.array(self.encoder_backend),
+                            mtimes=np.array(mtimes, dtype=np.int64),
+                            sizes=np.array(sizes, dtype=np.int64)
+                        )
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, self.encodings_cache)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except Exception as e:
+            self.logger.warning(f"Could not write encodings cache: {e}")
+    
+    def build_encodings_matrix(self):
+        """Stack known encodings into a contiguous (N, 128) matrix for matching"""
+        # float16 halves the bytes streamed per comparison; distances are
+        # still accumulated in float32
+        recognition_config = self.config['recognition']
+        half = recognition_config.get('half_precision_encodings', False)
+        dtype = np.float16 if half else np.float32
+        self.cosine_matching = recognition_config.get('cosine_matching', False)
+        if self.known_face_encodings:
+            matrix = np.stack(self.known_face_encodings).astype(np.float32)
+            if self.cosine_matching:
+                # Unit rows turn matching into a single dot product per face
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1
+                matrix /= norms
+                if recognition_config.get('int8_encodings', False):
+                    if numba is None:
+                        # Without the int8 kernel, NumPy would have to widen the
+                        # whole gallery per query, which is slower than float32
+                        self.logger.warning("int8_encodings needs numba; using float32 encodings")
+                    else:
+                        # Unit components fit int8 at scale 127: 128 B per face
+                        matrix = np.clip(np.round(matrix * 127), -128, 127)
+                        dtype = np.int8
+            self.known_encodings_matrix = np.ascontiguousarray(matrix, dtype=dtype)
+        else:
+            self.known_encodings_matrix = np.empty((0, 128), dtype=dtype)
+        # For unit vectors |m - q|^2 = 2 - 2 m.q, so the L2 tolerance maps to
+        # a cosine threshold once here
+        self.cos_thresh = 1 - recognition_config['tolerance'] ** 2 / 2
+        # Precomputed squared norms: |m - q|^2 = |m|^2 + |q|^2 - 2 m.q
+        self.known_norms_sq = (self.known_encodings_matrix.astype(np.float32) ** 2).sum(axis=1)
     
     def process_tts_queue(self):
         """Process text-to-speech queue"""
@@ -266,8 +683,14 @@ class FacialRecognitionSystem:
             try:
                 message = self.tts_queue.get(timeout=1)
                 if message and self.config['greeting']['enabled']:
-                    self.tts_engine.say(message)
-                    self.tts_engine.runAndWait()
+                    wav_path = self.greeting_wavs.get(message)
+                    if wav_path is not None and wav_path.exists():
+                        # Pre-rendered greeting: just play the PCM
+                        subprocess.run(['aplay', '-q', str(wav_path)], check=False)
+                    else:
+                        with self.tts_lock:
+                            self.tts_engine.say(message)
+                            self.tts_engine.runAndWait()
                 self.tts_queue.task_done()
             except queue.Empty:
                 continue
@@ -279,26 +702,26 @@ class FacialRecognitionSystem:
         if self.config['greeting']['enabled']:
             self.tts_queue.put(message)
     
-    def get_frame(self):
-        """Get frame from camera with error recovery"""
+    def get_frame(self, buffer=None):
+        """Get frame from camera with error recovery, reading into buffer if given"""
         if self.using_picamera:
             try:
-                # Capture frame from Picamera2
+                # Capture frame from Picamera2 (already BGR unless YUV420 was requested)
                 frame = self.camera.capture_array()
+                if frame is not None and self.picamera_yuv:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420, dst=buffer)
                 if frame is not None:
-                    # Convert frame to RGB format
-                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
                     return True, frame
             except Exception as e:
                 self.logger.error(f"Picamera2 capture error: {e}")
-                return False, None
+            return False, None
         else:
             if not hasattr(self, 'camera') or not self.camera.isOpened():
                 self.logger.error("Camera not initialized or closed")
                 return False, None
                 
             for _ in range(3):  # Try up to 3 times
-                ret, frame = self.camera.read()
+                ret, frame = self.camera.read(buffer)
                 if ret and frame is not None:
                     return True, frame
                 self.logger.warning("Failed to capture frame, retrying...")
@@ -309,61 +732,318 @@ class FacialRecognitionSystem:
             return False, None
     
     def process_frame(self, frame):
-        """Process a single frame"""
-        # Convert frame to RGB
-        rgb_frame = frame if self.using_picamera else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        """Process a single frame, returning a list of (name, location) faces"""
+        self.frame_idx += 1
+        
+        # Detect on a downscaled copy; detector cost scales with pixel count
+        scale = self.config['recognition'].get('detection_scale', 0.25)
+        small_bgr, small_rgb = self.get_small_buffers(frame.shape, scale)
+        cv2.resize(frame, (small_bgr.shape[1], small_bgr.shape[0]), dst=small_bgr,
+                   interpolation=cv2.INTER_AREA)
+        
+        # Between full detections, follow the last detected faces with trackers
+        # 0 or negative would divide by zero below; 1 means detect every frame
+        detect_every = max(1, int(self.config['recognition'].get('detect_every', 5)))
+        if self.trackers and self.frame_idx % detect_every:
+            return self.track_faces(small_bgr, scale)
+        
+        # BGR -> RGB into a reused contiguous buffer for dlib
+        small_frame = cv2.cvtColor(small_bgr, cv2.COLOR_BGR2RGB, dst=small_rgb)
         
         # Find faces in frame
-        locations = face_recognition.face_locations(
-            rgb_frame,
-            model=self.config['recognition']['model']
-        )
+        small_locations = self.detect_faces(small_bgr, small_frame)
+        
+        self.trackers = []
+        self.tracked_names = []
+        if not small_locations:
+            return []
+        
+        # Largest (nearest) faces first; tiny distant ones are rarely recognizable
+        small_locations = sorted(
+            small_locations,
+            key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]),
+            reverse=True
+        )[:self.config['recognition'].get('max_faces', 4)]
+        
+        # Scale boxes back to full-frame coordinates for encoding, drawing and cropping
+        locations = [tuple(int(v / scale) for v in loc) for loc in small_locations]
         
+        # Faces overlapping a recently recognized one keep its name unencoded
+        current_time = time.time()
+        self.recent_known = [entry for entry in self.recent_known
+                             if current_time - entry[2] <= 1.0]
+        reused = [self.recent_known_match(location) for location in locations]
+        to_encode = [i for i, entry in enumerate(reused) if entry is None]
+        
+        # Get face encodings, from full-resolution crops unless disabled
+        full_resolution = self.config['recognition'].get('encode_full_resolution', True)
+        if not to_encode:
+            encodings = []
+        elif self.encoder_backend == 'onnx':
+            if full_resolution:
+                encodings = self.encode_faces_onnx(frame, [locations[i] for i in to_encode])
+            else:
+                encodings = self.encode_faces_onnx(small_bgr, [small_locations[i] for i in to_encode])
+        elif full_resolution:
+            encodings = self.encode_faces(frame, [locations[i] for i in to_encode])
+        else:
+            encodings = face_recognition.face_encodings(
+                small_frame,
+                [small_locations[i] for i in to_encode],
+                num_jitters=1  # Increase for better accuracy, but slower
+            )
+        encodings = dict(zip(to_encode, encodings))
+        
+        # Process each face (boxes are drawn later by the display thread)
+        faces = []
+        known_names = []
+        recent_known = []
+        for i, (location, small_location) in enumerate(zip(locations, small_locations)):
+            if reused[i] is not None:
+                # Keep the original timestamp so the face is re-encoded within a second
+                name, last_seen = reused[i][1], reused[i][2]
+            else:
+                encoding = encodings.get(i)
+                if encoding is None:
+                    continue
+                name, last_seen = self.identify_face(encoding, location), current_time
+                if name == "Unknown":
+                    self.handle_unknown_face(encoding, location, frame)
+            if name != "Unknown":
+                known_names.append(name)
+                recent_known.append((location, name, last_seen))
+            faces.append((name, location))
+            
+            tracker = self.create_tracker()
+            if tracker is not None:
+                top, right, bottom, left = small_location
+                tracker.init(small_bgr, (left, top, right - left, bottom - top))
+                self.trackers.append(tracker)
+                self.tracked_names.append(name)
+        
+        self.recent_known = recent_known
+        self.greet_batch(known_names)
+        return faces
+    
+    def encode_faces(self, frame, locations):
+        """Encode faces from padded full-resolution crops of the BGR frame"""
+        height, width = frame.shape[:2]
+        encodings = []
+        for top, right, bottom, left in locations:
+            # Pad the crop so dlib's landmark model sees the whole face;
+            # only the crop is converted to RGB, never the full frame
+            pad = (bottom - top) // 2
+            crop_top, crop_bottom = max(0, top - pad), min(height, bottom + pad)
+            crop_left, crop_right = max(0, left - pad), min(width, right + pad)
+            crop = cv2.cvtColor(frame[crop_top:crop_bottom, crop_left:crop_right],
+                                cv2.COLOR_BGR2RGB)
+            encodings.extend(face_recognition.face_encodings(
+                crop,
+                [(top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)],
+                num_jitters=1  # Increase for better accuracy, but slower
+            ))
+        return encodings
+    
+    def encode_faces_onnx(self, image, locations, bgr=True):
+        """Encode face boxes of image with the ONNX model in one batched run"""
         if not locations:
-            return frame
+            return []
+        width, height = self.encoder_input_size
+        chips = np.empty((len(locations), height, width, 3), dtype=np.uint8)
+        for chip, (top, right, bottom, left) in zip(chips, locations):
+            cv2.resize(image[top:bottom, left:right], (width, height), dst=chip,
+                       interpolation=cv2.INTER_AREA)
+        if bgr:
+            chips = chips[..., ::-1]
+        if self.encoder_nchw:
+            chips = chips.transpose(0, 3, 1, 2)
+        # uint8 -> float32 scaled to [-1, 1], as ArcFace/FaceNet exports expect
+        batch = (chips.astype(np.float32) - 127.5) / 128.0
+        embeddings = self.encoder_session.run(None, {self.encoder_input_name: batch})[0]
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-9)
+        return list(embeddings.astype(np.float32))
+    
+    def get_small_buffers(self, frame_shape, scale):
+        """Return preallocated downscaled BGR/RGB buffers, reallocating on size change"""
+        height, width = frame_shape[:2]
+        small_shape = (int(height * scale), int(width * scale), 3)
+        if self.small_bgr_buf is None or self.small_bgr_buf.shape != small_shape:
+            self.small_bgr_buf = np.empty(small_shape, dtype=np.uint8)
+            self.small_rgb_buf = np.empty(small_shape, dtype=np.uint8)
+        return self.small_bgr_buf, self.small_rgb_buf
+    
+    def detect_faces(self, bgr_frame, rgb_frame):
+        """Return (top, right, bottom, left) face boxes from the configured detector"""
+        if self.detector == 'yunet':
+            return self.detect_faces_yunet(bgr_frame)
+        if self.detector != 'dnn':
+            return face_recognition.face_locations(
+                rgb_frame,
+                model=self.config['recognition']['model']
+            )
         
-        # Get face encodings
-        encodings = face_recognition.face_encodings(
-            rgb_frame,
-            locations,
-            num_jitters=1  # Increase for better accuracy, but slower
-        )
+        height, width = bgr_frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(bgr_frame, 1.0, (300, 300), (104, 177, 123))
+        self.face_net.setInput(blob)
+        detections = self.face_net.forward()
         
-        # Process each face
-        for encoding, location in zip(encodings, locations):
-            name = self.identify_face(encoding)
-            self.handle_face(name, encoding, location, frame)
+        min_confidence = self.config['recognition'].get('dnn_confidence', 0.6)
+        locations = []
+        for detection in detections[0, 0]:
+            if detection[2] < min_confidence:
+                continue
+            left, top, right, bottom = (detection[3:7] * (width, height, width, height)).astype(int)
+            top, left = max(0, top), max(0, left)
+            bottom, right = min(height, bottom), min(width, right)
+            if bottom > top and right > left:
+                locations.append((int(top), int(right), int(bottom), int(left)))
+        return locations
+    
+    def detect_faces_yunet(self, bgr_frame):
+        """Return (top, right, bottom, left) face boxes from YuNet"""
+        height, width = bgr_frame.shape[:2]
+        if self.yunet_input_size != (width, height):
+            self.face_net.setInputSize((width, height))
+            self.yunet_input_size = (width, height)
+        
+        _, detections = self.face_net.detect(bgr_frame)
+        if detections is None:
+            return []
+        
+        locations = []
+        for left, top, box_width, box_height in detections[:, :4].astype(int):
+            top, left = max(0, top), max(0, left)
+            bottom, right = min(height, top + box_height), min(width, left + box_width)
+            if bottom > top and right > left:
+                locations.append((int(top), int(right), int(bottom), int(left)))
+        return locations
+    
+    def create_tracker(self):
+        """Create a lightweight single-object tracker, or None if unavailable"""
+        for factory in ('legacy.TrackerKCF_create', 'TrackerKCF_create', 'TrackerMIL_create'):
+            module = cv2
+            for attr in factory.split('.'):
+                module = getattr(module, attr, None)
+                if module is None:
+                    break
+            if module is not None:
+                return module()
+        return None
+    
+    def track_faces(self, small_frame, scale):
+        """Update trackers between detections, returning faces with cached names"""
+        trackers, names, faces = [], [], []
+        for tracker, name in zip(self.trackers, self.tracked_names):
+            ok, (x, y, w, h) = tracker.update(small_frame)
+            if not ok:
+                continue
+            location = tuple(int(v / scale) for v in (y, x + w, y + h, x))
+            faces.append((name, location))
+            trackers.append(tracker)
+            names.append(name)
         
-        return frame
+        # Lost faces drop out; an empty list forces detection on the next frame
+        self.trackers = trackers
+        self.tracked_names = names
+        return faces
+    
+    def recent_known_match(self, face_location, min_iou=0.7):
+        """Return the recently recognized (location, name, last_seen) overlapping this box"""
+        top, right, bottom, left = face_location
+        area = (bottom - top) * (right - left)
+        for entry in self.recent_known:
+            r_top, r_right, r_bottom, r_left = entry[0]
+            inter_h = min(bottom, r_bottom) - max(top, r_top)
+            inter_w = min(right, r_right) - max(left, r_left)
+            if inter_h <= 0 or inter_w <= 0:
+                continue
+            inter = inter_h * inter_w
+            union = area + (r_bottom - r_top) * (r_right - r_left) - inter
+            if union > 0 and inter / union > min_iou:
+                return entry
+        return None
+    
+    def face_key(self, face_location):
+        """Quantized box centroid: a cheap int key that survives small box jitter"""
+        top, right, bottom, left = face_location
+        return ((left + right) // 32) * 10000 + (top + bottom) // 32
     
-    def identify_face(self, face_encoding):
-        """Identify a face encoding"""
-        if not self.known_face_encodings:
+    def identify_face(self, face_encoding, face_location=None):
+        """Identify a face encoding, reusing a recent match at the same location"""
+        if not len(self.known_encodings_matrix):
             return "Unknown"
         
-        if self.config['security']['encrypt_faces']:
-            face_encoding = self.encrypt_encoding(face_encoding)
+        q = np.ascontiguousarray(face_encoding, dtype=np.float32)
+        if face_location is None:
+            return self.match_known_face(q)
         
-        matches = face_recognition.compare_faces(
-            self.known_face_encodings,
-            face_encoding,
-            tolerance=self.config['recognition']['tolerance']
-        )
+        current_time = time.time()
+        if current_time - self.last_id_cache_prune > 1.0:
+            self.last_id_cache_prune = current_time
+            for key, (_, _, seen) in list(self.id_cache.items()):
+                if current_time - seen > 2.0:
+                    del self.id_cache[key]
         
-        if True in matches:
-            face_distances = face_recognition.face_distance(
-                self.known_face_encodings,
-                face_encoding
-            )
-            best_match_index = np.argmin(face_distances)
-            if matches[best_match_index]:
-                return self.known_face_names[best_match_index]
+        # A face that barely changed since its last real match keeps its
+        # identity. The reference encoding is only replaced on a real match,
+        # so a slowly changing face cannot drift away from it unchecked.
+        key = self.face_key(face_location)
+        cached = self.id_cache.get(key)
+        if cached is not None and np.sum((q - cached[1]) ** 2) < 0.04:
+            self.id_cache[key] = (cached[0], cached[1], current_time)
+            return cached[0]
+        name = self.match_known_face(q)
+        self.id_cache[key] = (name, q, current_time)
+        return name
+    
+    def match_known_face(self, q):
+        """Return the name of the closest known face within tolerance"""
+        # Squared distances to every known face, via the JIT kernel when numba
+        # is installed, otherwise a single sgemv call
+        matrix = self.known_encodings_matrix
+        if self.cosine_matching:
+            return self.match_known_face_cosine(q)
+        if matrix.dtype == np.float16:
+            dots = np.einsum('ij,j->i', matrix, q, dtype=np.float32)
+            dists = self.known_norms_sq + (q @ q) - 2 * dots
+        elif numba is not None and len(matrix) < SMALL_GALLERY:
+            dists = None
+            best_match_index, best_dist = _nearest(matrix, q)
+        elif numba is not None:
+            dists = _sq_eucl_batch(matrix, q)
+        else:
+            dists = self.known_norms_sq + (q @ q) - 2 * (matrix @ q)
+        if dists is not None:
+            best_match_index = int(np.argmin(dists))
+            best_dist = dists[best_match_index]
+        
+        tolerance = self.config['recognition']['tolerance']
+        if best_dist <= tolerance ** 2:
+            return self.known_face_names[best_match_index]
         
         return "Unknown"
     
-    def handle_face(self, name, face_encoding, face_location, frame):
-        """Handle detected face"""
-        # Draw rectangle and name
+    def match_known_face_cosine(self, q):
+        """Return the name of the most similar known face above the cosine threshold"""
+        q = q / max(float(np.linalg.norm(q)), 1e-9)
+        matrix = self.known_encodings_matrix
+        if matrix.dtype == np.int8:
+            # Integer dot products read straight from the int8 gallery and
+            # accumulated in int32, compared against the threshold in int space
+            q8 = np.clip(np.round(q * 127), -128, 127).astype(np.int8)
+            best_match_index, best_score = _best_dot_i8(matrix, q8)
+            threshold = self.cos_thresh * 127 * 127
+        else:
+            scores = np.dot(matrix, q.astype(matrix.dtype))
+            best_match_index = int(np.argmax(scores))
+            best_score = scores[best_match_index]
+            threshold = self.cos_thresh
+        if best_score > threshold:
+            return self.known_face_names[best_match_index]
+        return "Unknown"
+    
+    def draw_face(self, frame, name, face_location):
+        """Draw face box and name label"""
         top, right, bottom, left = face_location
         color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
         
@@ -371,66 +1051,95 @@ class FacialRecognitionSystem:
         cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
         cv2.putText(frame, name, (left + 6, bottom - 6),
                    cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-        
-        # Handle greeting
-        if name != "Unknown":
-            self.handle_known_face(name)
-        else:
-            self.handle_unknown_face(face_encoding, face_location, frame)
     
-    def handle_known_face(self, name):
-        """Handle known face detection"""
+    def greet_batch(self, names):
+        """Greet every known face in a frame whose cooldown has expired"""
+        if not names:
+            return
         current_time = time.time()
-        last_greeting = self.last_greeting_time.get(name, 0)
-        
-        if current_time - last_greeting > self.config['greeting']['cooldown']:
+        due = [name for name in names
+               if current_time - self.last_greeting_time.get(name, 0) > self.greeting_cooldown]
+        for name in due:
             self.last_greeting_time[name] = current_time
-            
-            # Get custom greeting if available
-            greeting = self.config['greeting']['custom_greetings'].get(
-                name,
-                f"Hello {name}!"
-            )
-            
             self.logger.info(f"Greeting {name}")
-            self.speak_async(greeting)
+            self.speak_async(self.greetings_map.get(name) or self.greeting_for(name))
     
     def handle_unknown_face(self, face_encoding, face_location, frame):
         """Handle unknown face detection"""
         if not self.config['storage']['auto_clean']:
             return
         
-        face_key = str(face_location)
-        if face_key not in self.unknown_face_counters:
-            self.unknown_face_counters[face_key] = 0
+        # Skip people already saved recently, wherever they now stand
+        if self.recent_unknown_encodings:
+            recent = np.asarray(self.recent_unknown_encodings, dtype=np.float32)
+            q = np.asarray(face_encoding, dtype=np.float32)
+            if np.min(np.sum((recent - q) ** 2, axis=1)) < self.config['recognition']['tolerance'] ** 2:
+                return
+        
+        face_key = self.face_key(face_location)
+        current_time = time.time()
+        self.prune_unknown_face_counters(current_time)
+        
+        # LRU of [count, last_seen] per location, capped so it cannot grow unbounded
+        entry = self.unknown_face_counters.get(face_key)
+        if entry is None:
+            entry = self.unknown_face_counters[face_key] = [0, current_time]
+            if len(self.unknown_face_counters) > 64:
+                self.unknown_face_counters.popitem(last=False)
+        else:
+            self.unknown_face_counters.move_to_end(face_key)
         
-        self.unknown_face_counters[face_key] += 1
+        entry[0] += 1
+        entry[1] = current_time
         
         # Save unknown face after threshold
-        if self.unknown_face_counters[face_key] >= 10:
+        if entry[0] >= 10:
             self.save_unknown_face(frame, face_location, face_encoding)
-            self.unknown_face_counters[face_key] = -1000  # Prevent multiple saves
+            self.recent_unknown_encodings.append(face_encoding)
+            entry[0] = -1000  # Prevent multiple saves
+    
+    def prune_unknown_face_counters(self, current_time, max_age=5.0):
+        """Forget unknown-face counters that have not been seen recently"""
+        if current_time - self.last_counter_prune < 1.0:
+            return
+        self.last_counter_prune = current_time
+        for face_key, (_, last_seen) in list(self.unknown_face_counters.items()):
+            if current_time - last_seen > max_age:
+                del self.unknown_face_counters[face_key]
     
     def save_unknown_face(self, frame, face_location, face_encoding):
-        """Save unknown face"""
+        """Queue an unknown face to be written off the detection thread"""
+        # Copy the crop now: the frame buffer is recycled for later captures
+        top, right, bottom, left = face_location
+        face_image = frame[top:bottom, left:right].copy()
+        self.save_executor.submit(self.write_unknown_face, face_image,
+                                  np.array(face_encoding, dtype=np.float32))
+    
+    def write_unknown_face(self, face_image, face_encoding):
+        """Write an unknown face crop, its encoding and metadata to disk"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             face_id = str(uuid.uuid4())[:8]
             filename = f"unknown_{timestamp}_{face_id}.jpg"
             
-            # Extract and save face image
-            top, right, bottom, left = face_location
-            face_image = frame[top:bottom, left:right]
+            # Save face image
             face_path = self.unknown_faces_dir / filename
             cv2.imwrite(str(face_path), face_image)
             
-            # Save metadata
+            # Save encoding as raw float32 (or its Fernet token when encrypted)
+            if self.config['security']['encrypt_faces']:
+                encoding_file = self.unknown_faces_dir / f"{face_id}_encoding.enc"
+                encoding_file.write_bytes(self.encrypt_encoding(face_encoding))
+            else:
+                encoding_file = self.unknown_faces_dir / f"{face_id}_encoding.npy"
+                np.save(encoding_file, face_encoding)
+            
+            # Save human-readable metadata
             metadata = {
                 "timestamp": datetime.now().isoformat(),
                 "face_id": face_id,
                 "filename": filename,
-                "encoding": face_encoding.tolist() if not self.config['security']['encrypt_faces']
-                          else self.encrypt_encoding(face_encoding).tolist()
+                "encoding_file": encoding_file.name
             }
             
             metadata_file = self.unknown_faces_dir / f"{face_id}_meta.json"
@@ -443,39 +1152,118 @@ class FacialRecognitionSystem:
             self.logger.error(f"Error saving unknown face: {e}")
     
     def encrypt_encoding(self, encoding):
-        """Encrypt face encoding"""
-        if not self.config['security']['encrypt_faces']:
-            return encoding
-        try:
-            data = json.dumps(encoding.tolist()).encode()
-            return np.array(json.loads(
-                self.cipher.encrypt(data).decode()
-            ))
-        except Exception as e:
-            self.logger.error(f"Encryption error: {e}")
-            return encoding
+        """Encrypt face encoding for storage at rest, returning a Fernet token"""
+        return self.cipher.encrypt(np.asarray(encoding, dtype=np.float32).tobytes())
+    
+    def decrypt_encoding(self, token):
+        """Decrypt a Fernet token produced by encrypt_encoding"""
+        return np.frombuffer(self.cipher.decrypt(token), dtype=np.float32)
     
     def update_performance_stats(self):
         """Update performance statistics"""
-        if len(self.frame_times) > 30:
-            self.frame_times.pop(0)
-        
-        if self.frame_times:
-            fps = len(self.frame_times) / (self.frame_times[-1] - self.frame_times[0])
-            cpu_percent = psutil.cpu_percent()
-            memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+        span = self.frame_times[-1] - self.frame_times[0] if len(self.frame_times) > 1 else 0
+        if span > 0:
+            # N timestamps bound N - 1 frame intervals
+            fps = (len(self.frame_times) - 1) / span
+            cpu_percent, memory = self.last_stats
             
             return f"FPS: {fps:.1f} | CPU: {cpu_percent}% | Memory: {memory:.1f}MB"
         return ""
     
+    def put_latest(self, frame_queue, item):
+        """Put item on a single-slot queue, replacing and returning any stale entry"""
+        stale = None
+        try:
+            frame_queue.put_nowait(item)
+        except queue.Full:
+            try:
+                stale = frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            frame_queue.put_nowait(item)
+        return stale
+    
+    def take_frame_buffer(self):
+        """Return a recycled frame buffer, or None to let the camera allocate one"""
+        try:
+            return self.frame_pool.get_nowait()
+        except queue.Empty:
+            return None
+    
+    def recycle_frame(self, frame):
+        """Hand a frame no pipeline stage still uses back for the next capture"""
+        # Picamera2 RGB frames are its own buffers; only converted YUV frames are ours
+        if frame is None or (self.using_picamera and not self.picamera_yuv):
+            return
+        try:
+            self.frame_pool.put_nowait(frame)
+        except queue.Full:
+            pass
+    
+    def capture_loop(self):
+        """Capture thread: keep the newest camera frame available"""
+        while self.running:
+            ret, frame = self.get_frame(self.take_frame_buffer())
+            if not ret:
+                self.logger.error("Failed to capture frame")
+                time.sleep(0.1)
+                continue
+            self.recycle_frame(self.put_latest(self.capture_q, frame))
+    
+    def detection_loop(self):
+        """Detection thread: run recognition on the newest captured frame"""
+        self.pin_detection_thread()
+        while self.running:
+            try:
+                frame = self.capture_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            try:
+                # Reload here so the known-face data never changes mid-frame
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.load_known_faces()
+                
+                faces = self.process_frame(frame)
+                stale = self.put_latest(self.result_q, (frame, faces))
+                if stale is not None:
+                    self.recycle_frame(stale[0])
+            except Exception as e:
+                self.logger.error(f"Error processing frame: {e}")
+    
+    def stats_loop(self):
+        """Stats thread: sample CPU and memory once a second while stats are shown"""
+        while self.running:
+            if self.show_stats:
+                self.last_stats = (
+                    psutil.cpu_percent(None),
+                    self.process.memory_info().rss / 1024 / 1024  # MB
+                )
+            time.sleep(1.0)
+    
+    def stdin_loop(self):
+        """Headless key thread: read single-letter commands from stdin"""
+        for line in sys.stdin:
+            for char in line.strip():
+                self.key_q.put(ord(char))
+    
     def cleanup(self):
         """Clean up resources"""
         self.logger.info("Cleaning up...")
+        self.running = False
+        for thread in (self.capture_thread, self.detection_thread, self.stats_thread):
+            thread.join(timeout=5)
+        
         if self.using_picamera:
             self.camera.stop()
         else:
             self.camera.release()
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
+        
+        # Let queued unknown-face writes finish
+        self.save_executor.shutdown(wait=True)
         
         if self.config['greeting']['enabled']:
             self.tts_queue.join()
@@ -485,37 +1273,64 @@ class FacialRecognitionSystem:
         self.logger.info("Starting facial recognition system...")
         self.logger.info("Press 'q' to quit, 'r' to reload faces, 's' to toggle stats")
         
+        # Capture and detection run on their own threads; this thread only
+        # displays processed frames and handles key presses
+        self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.detection_thread = threading.Thread(target=self.detection_loop, daemon=True)
+        self.stats_thread = threading.Thread(target=self.stats_loop, daemon=True)
+        self.capture_thread.start()
+        self.detection_thread.start()
+        self.stats_thread.start()
+        if self.headless:
+            threading.Thread(target=self.stdin_loop, daemon=True).start()
+        
+        # pollKey (OpenCV >= 4.5) services the window without waitKey's delay
+        poll_key = getattr(cv2, 'pollKey', None) or (lambda: cv2.waitKey(1))
+        
+        frame = None
         while self.running:
             try:
-                # Capture frame
-                ret, frame = self.get_frame()
-                if not ret:
-                    self.logger.error("Failed to capture frame")
-                    continue
-                
-                # Process frame
-                frame = self.process_frame(frame)
-                
-                # Update performance stats
-                if self.show_stats:
-                    self.frame_times.append(time.time())
-                    stats = self.update_performance_stats()
-                    cv2.putText(frame, stats, (10, 30),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                try:
+                    result = self.result_q.get(timeout=0.1)
+                except queue.Empty:
+                    result = None
                 
-                # Display frame
-                cv2.imshow('Facial Recognition System', frame)
+                if result is not None:
+                    # imshow has already copied the previous frame
+                    self.recycle_frame(frame)
+                    frame, faces = result
+                    
+                    # Draw rectangles and names
+                    for name, location in faces:
+                        self.draw_face(frame, name, location)
+                    
+                    # Update performance stats
+                    if self.show_stats:
+                        self.frame_times.append(time.time())
+                        stats = self.update_performance_stats()
+                        cv2.putText(frame, stats, (10, 30),
+                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    
+                    # Display frame
+                    if not self.headless:
+                        cv2.imshow('Facial Recognition System', frame)
                 
                 # Handle key presses
-                key = cv2.waitKey(1) & 0xFF
+                if self.headless:
+                    try:
+                        key = self.key_q.get_nowait()
+                    except queue.Empty:
+                        key = None
+                else:
+                    key = poll_key() & 0xFF
                 if key == ord('q'):
                     self.running = False
                 elif key == ord('r'):
                     self.logger.info("Reloading known faces...")
-                    self.load_known_faces()
+                    self.reload_requested = True
                 elif key == ord('s'):
                     self.show_stats = not self.show_stats
-                elif key == ord('c'):
+                elif key == ord('c') and frame is not None:
                     # Capture current frame
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     cv2.imwrite(f"capture_{timestamp}.jpg", frame)
@@ -8,7 +8,12 @@ import cv2
 import numpy as np
 import yaml
 import os
+import fcntl
+import tempfile
 import json
+import shutil
+import hashlib
+import subprocess
 import time
 import uuid
 import logging
@@ -18,6 +23,8 @@ import pyttsx3
 import psutil
 import signal
 import sys
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
@@ -25,6 +32,49 @@ from PIL import Image
 from cryptography.fernet import Fernet
 import face_recognition
 
+try:
+    import numba  # Optional: JIT-compiled distance kernel
+except ImportError:
+    numba = None
+
+if numba is not None:
+    # The explicit signature compiles at import (from the on-disk cache after
+    # the first run) instead of on the first recognized face
+    @numba.njit('Tuple((i8, f4))(f4[:, ::1], f4[::1])', parallel=True, fastmath=True, cache=True)
+    def best_match(M, q):
+        """Index and euclidean distance of the row of M nearest to q"""
+        n, d = M.shape
+        dists = np.empty(n, np.float32)
+        for i in numba.prange(n):
+            s = np.float32(0)
+            for j in range(d):
+                diff = M[i, j] - q[j]
+                s += diff * diff
+            dists[i] = s
+        best_i = np.argmin(dists)
+        return best_i, np.sqrt(dists[best_i])
+    
+    @numba.njit('Tuple((i8, i8))(i1[:, ::1], i1[::1])', parallel=True, cache=True)
+    def best_match_i8(M, q):
+        """Index and squared distance, in quantized units, of the int8 row nearest to q"""
+        n, d = M.shape
+        dists = np.empty(n, np.int32)
+        for i in numba.prange(n):
+            s = np.int32(0)
+            for j in range(d):
+                diff = np.int32(M[i, j]) - np.int32(q[j])
+                s += diff * diff
+            dists[i] = s
+        best_i = np.argmin(dists)
+        return best_i, np.int64(dists[best_i])
+
+@dataclass
+class Overlay:
+    """A face box and label for the display thread to draw"""
+    location: tuple  # (top, right, bottom, left)
+    name: str
+    color: tuple  # BGR
+
 class FacialRecognitionSystem:
     def __init__(self):
         """Initialize system components and configuration"""
@@ -73,15 +123,49 @@ class FacialRecognitionSystem:
         self.setup_storage()
         self.setup_camera()
         self.setup_audio()
-        self.setup_face_recognition()
         self.setup_encryption()
+        self.setup_face_recognition()
+        
+        # Settings read on every frame, hoisted out of the nested config dicts.
+        # Read after setup, which may disable greetings if audio fails.
+        recognition_config = self.config['recognition']
+        greeting_config = self.config['greeting']
+        self.rec_model = recognition_config['model']
+        self.rec_tolerance = recognition_config['tolerance']
+        self.detection_scale = recognition_config.get('detection_scale', 0.25)
+        self.greet_cooldown = greeting_config['cooldown']
+        self.custom_greetings = greeting_config['custom_greetings']
+        self.greet_enabled = greeting_config['enabled']  # Toggled with 'v'
+        
+        # OpenCV's transparent API runs pixel ops on the GPU (VideoCore on a
+        # Pi 4) through OpenCL when asked for and available
+        self.use_opencl = (self.config['performance'].get('gpu_enabled', False)
+                           and cv2.ocl.haveOpenCL())
+        cv2.ocl.setUseOpenCL(self.use_opencl)
+        if self.use_opencl:
+            self.logger.info("Using OpenCL for frame resizing")
         
         # Initialize state variables
         self.running = True
         self.show_stats = False
-        self.frame_times = []
+        self.frame_times = deque(maxlen=30)  # Oldest entries evicted in O(1)
+        self.process = psutil.Process()
+        self.last_stats_time = 0.0
+        self.cached_stats = ""
         self.last_greeting_time = {}
-        self.unknown_face_counters = {}
+        # Unknown faces being captured: dicts of bbox, count, last (seen) and saved
+        self.unknown_tracks = []
+        
+        # Newest camera frame only; the capture thread replaces it if unread
+        self.frame_q = queue.Queue(maxsize=1)
+        # Newest (frame, overlays, stats) for display, same replace-if-unread policy
+        self.display_q = queue.Queue(maxsize=1)
+        self.reload_requested = False
+        
+        # Unknown faces waiting to be written by the writer thread
+        self.save_q = queue.Queue()
+        self.save_thread = threading.Thread(target=self.save_worker, daemon=True)
+        self.save_thread.start()
     
     def setup_storage(self):
         """Set up storage directories"""
@@ -93,6 +177,16 @@ class FacialRecognitionSystem:
             dir_path = Path(storage_config[dir_name])
             dir_path.mkdir(parents=True, exist_ok=True)
             setattr(self, dir_name, dir_path)
+        
+        # Cached known-face encodings, keyed by source image file. Kept out of
+        # known_faces_dir so face management never mistakes it for a person;
+        # the same file and layout as face_recognition.py and manage_faces.py.
+        self.encodings_cache = self.base_dir / 'encodings.npz'
+        
+        # Pre-rendered greeting audio, keyed by greeting text
+        self.tts_cache_dir = self.base_dir / 'tts_cache'
+        self.tts_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.greeting_wavs = {}
     
     def setup_camera(self):
         """Initialize camera with USB webcam device"""
@@ -112,6 +206,9 @@ class FacialRecognitionSystem:
                     self.camera.set(cv2.CAP_PROP_FPS, self.config['recognition']['frame_rate'])
                     self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 1)
                     self.camera.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)
+                    # Keep at most one frame queued in the driver so we never
+                    # process stale frames
+                    self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
                     
                     # Create window
                     cv2.namedWindow('Facial Recognition System', cv2.WINDOW_NORMAL)
@@ -132,13 +229,14 @@ class FacialRecognitionSystem:
     
     def setup_audio(self):
         """Initialize text-to-speech synthesis engine"""
+        # pyttsx3 engines are not thread-safe; pre-rendering (recognition
+        # thread on reload) and live speech (TTS thread) share one
+        self.tts_lock = threading.Lock()
         try:
             self.logger.info("Initializing audio system...")
             
             # Try to set default audio device to Bluetooth
             try:
-                import subprocess
-                
                 # Get list of audio devices
                 devices = subprocess.check_output(['pactl', 'list', 'short', 'sinks']).decode().strip().split('\n')
                 print("\nAvailable audio devices:")
@@ -210,8 +308,70 @@ class FacialRecognitionSystem:
         """Initialize face detection and recognition components"""
         self.known_face_encodings = []
         self.known_face_names = []
+        self.known_matrix = np.empty((0, 128), dtype=np.float32)
+        self.known_matrix_i8 = None
+        self.setup_face_detector()
+        self.check_dlib_build()
         self.load_known_faces()
     
+    def setup_face_detector(self):
+        """Load the YuNet face detector if configured, else use dlib"""
+        recognition_config = self.config['recognition']
+        self.detector = None
+        detector = recognition_config.get('detector', 'dlib')
+        if detector != 'yunet':
+            # config.yml also offers 'dnn', which only face_recognition.py implements
+            if detector != 'dlib':
+                self.logger.warning(f"Face detector '{detector}' is not supported here; using dlib")
+            return
+        try:
+            # Input size is set per frame in detect_faces
+            self.detector = cv2.FaceDetectorYN.create(
+                recognition_config['yunet_model'], '', (320, 320),
+                score_threshold=recognition_config.get('dnn_confidence', 0.6),
+                nms_threshold=0.3,
+                top_k=50
+            )
+            self.detector_input_size = None
+            self.logger.info("Using OpenCV YuNet face detector")
+        except Exception as e:
+            self.logger.error(f"Failed to load YuNet face detector: {e}")
+            print("Falling back to dlib face detection")
+            self.detector = None
+    
+    def check_dlib_build(self):
+        """Warn when dlib lacks SIMD/BLAS support, which makes encoding several times slower"""
+        try:
+            import dlib
+            build_flags = {
+                flag: getattr(dlib, flag)
+                for flag in ('USE_NEON_INSTRUCTIONS', 'USE_AVX_INSTRUCTIONS',
+                             'USE_SSE4_INSTRUCTIONS', 'DLIB_USE_BLAS', 'DLIB_USE_CUDA')
+                if hasattr(dlib, flag)
+            }
+            self.logger.info(f"dlib {dlib.__version__} build: {build_flags or 'flags not reported'}")
+            if build_flags and not any(build_flags.values()):
+                self.logger.warning(
+                    "dlib was built without NEON/AVX or BLAS; rebuild it with install.sh "
+                    "(see README, Performance)"
+                )
+        except Exception as e:
+            self.logger.warning(f"Could not query dlib build: {e}")
+        
+        # Time one encoding of a blank face chip to catch unoptimized builds
+        try:
+            blank = np.zeros((150, 150, 3), dtype=np.uint8)
+            face_recognition.face_encodings(blank, [(0, 150, 150, 0)])
+            start = time.time()
+            face_recognition.face_encodings(blank, [(0, 150, 150, 0)])
+            elapsed_ms = (time.time() - start) * 1000
+            self.logger.info(f"dlib face encoding takes {elapsed_ms:.0f}ms")
+            if elapsed_ms > self.config['performance'].get('encoding_warn_ms', 500):
+                print(f"WARNING: face encoding takes {elapsed_ms:.0f}ms - "
+                      "rebuild dlib with NEON and OpenBLAS (see README)")
+        except Exception as e:
+            self.logger.warning(f"Could not benchmark dlib: {e}")
+    
     def setup_encryption(self):
         """Configure face data encryption if enabled"""
         if self.config['security']['encrypt_faces']:
@@ -243,40 +403,172 @@ class FacialRecognitionSystem:
     def load_known_faces(self):
         """Load known faces from storage"""
         self.logger.info("Loading known faces...")
+        # Start from scratch so a reload does not duplicate faces
+        self.known_face_encodings = []
+        self.known_face_names = []
+        cache = self.load_encodings_cache()
+        cache_names, cache_encs, cache_mtimes, cache_sizes = [], [], [], []
+        cache_stale = False
         try:
             for face_file in self.known_faces_dir.glob('*.*'):
                 if face_file.suffix.lower() in ('.png', '.jpg', '.jpeg'):
                     name = face_file.stem
-                    self.logger.debug(f"Loading face for: {name}")
+                    stat = face_file.stat()
                     
-                    # Load and process face
-                    image = face_recognition.load_image_file(str(face_file))
-                    encodings = face_recognition.face_encodings(image)
+                    cached = cache.get(face_file.name)
+                    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                        face_encoding = cached[2]
+                    else:
+                        cache_stale = True
+                        self.logger.debug(f"Loading face for: {name}")
+                        
+                        # Load and process face
+                        image = face_recognition.load_image_file(str(face_file))
+                        encodings = face_recognition.face_encodings(image)
+                        face_encoding = encodings[0] if encodings else None
+                        if face_encoding is None:
+                            self.logger.warning(f"No face found in {face_file}")
                     
-                    if encodings:
-                        face_encoding = encodings[0]
-                        if self.config['security']['encrypt_faces']:
-                            face_encoding = self.encrypt_encoding(face_encoding)
+                    # Faceless images are cached too, so an unchanged one is
+                    # not run through detection again on every load
+                    cache_names.append(face_file.name)
+                    cache_encs.append(face_encoding)
+                    cache_mtimes.append(stat.st_mtime_ns)
+                    cache_sizes.append(stat.st_size)
+                    if face_encoding is not None:
+                        # Kept in plaintext in memory; only the on-disk copy is encrypted
                         self.known_face_encodings.append(face_encoding)
                         self.known_face_names.append(name)
                         self.logger.debug(f"Successfully loaded face for: {name}")
-                    else:
-                        self.logger.warning(f"No face found in {face_file}")
             
+            # Only rewrite the cache when an image was added, changed or removed
+            if cache_stale or set(cache_names) != set(cache):
+                self.save_encodings_cache(cache_names, cache_encs, cache_mtimes, cache_sizes)
+            self.build_known_matrix()
+            self.prerender_greetings()
             self.logger.info(f"Loaded {len(self.known_face_names)} known faces")
         except Exception as e:
             self.logger.error(f"Error loading known faces: {e}")
     
+    def build_known_matrix(self):
+        """Stack known encodings into one (N, 128) float32 matrix for matching"""
+        if self.known_face_encodings:
+            self.known_matrix = np.ascontiguousarray(self.known_face_encodings, dtype=np.float32)
+        else:
+            self.known_matrix = np.empty((0, 128), dtype=np.float32)
+        # Precomputed squared norms: |m - q|^2 = |m|^2 + |q|^2 - 2 m.q
+        self.known_norms_sq = (self.known_matrix ** 2).sum(axis=1)
+        
+        # Optional int8 copy with one shared scale: a quarter of the bytes
+        # streamed per comparison
+        self.known_matrix_i8 = None
+        if self.config['recognition'].get('int8_encodings', False) and len(self.known_matrix):
+            self.quant_scale = float(np.abs(self.known_matrix).max()) / 127 or 1.0
+            self.known_matrix_i8 = np.round(self.known_matrix / self.quant_scale).astype(np.int8)
+            self.quant_tolerance_sq = (self.config['recognition']['tolerance'] / self.quant_scale) ** 2
+    
+    def load_encodings_cache(self):
+        """Load cached encodings as {filename: (mtime_ns, size, encoding)}, None if faceless"""
+        if not self.encodings_cache.exists():
+            return {}
+        try:
+            with np.load(self.encodings_cache) as data:
+                encrypted = bool(data['encrypted']) if 'encrypted' in data else False
+                if encrypted != self.config['security']['encrypt_faces']:
+                    return {}
+                # Only dlib encodings are comparable with the ones computed here
+                backend = str(data['backend']) if 'backend' in data else 'dlib'
+                if backend != 'dlib':
+                    return {}
+                encs = data['encs']
+                if encrypted:
+                    encs = [self.decrypt_encoding(bytes(token)) for token in encs]
+                return {
+                    str(name): (int(mtime), int(size),
+                                None if np.isnan(enc).any() else np.asarray(enc, dtype=np.float64))
+                    for name, mtime, size, enc in zip(
+                        data['names'], data['mtimes'], data['sizes'], encs
+                    )
+                }
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable encodings cache: {e}")
+            return {}
+    
+    def save_encodings_cache(self, names, encs, mtimes, sizes):
+        """Persist known-face encodings so unchanged images are not re-encoded"""
+        try:
+            # Images without a face are stored as a NaN row
+            encs = [np.full(128, np.nan) if enc is None else enc for enc in encs]
+            encrypted = self.config['security']['encrypt_faces']
+            if encrypted:
+                # Never write plaintext face data when encryption is enabled
+                encs = np.array([self.encrypt_encoding(enc) for enc in encs], dtype=bytes)
+            else:
+                encs = np.stack(encs) if encs else np.empty((0, 128))
+            # manage_faces.py updates the same cache; share its lock and swap
+            # the file in whole so neither writer installs a partial cache
+            lock_path = self.encodings_cache.with_name(self.encodings_cache.name + '.lock')
+            with open(lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                fd, tmp_path = tempfile.mkstemp(dir=self.encodings_cache.parent, suffix='.npz.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        np.savez(
+                            f,
+                            names=np.array(names, dtype=str),
+                            encs=encs,
+                            encrypted=np.array(encrypted),
+                            backend=np.array('dlib'),
+                            mtimes=np.array(mtimes, dtype=np.int64),
+                            sizes=np.array(sizes, dtype=np.int64)
+                        )
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, self.encodings_cache)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except Exception as e:
+            self.logger.warning(f"Could not write encodings cache: {e}")
+    
+    def prerender_greetings(self):
+        """Synthesize each known person's greeting to a WAV file once"""
+        if not self.config['greeting']['enabled'] or not hasattr(self, 'tts_engine'):
+            return
+        if not shutil.which('aplay'):
+            self.logger.debug("aplay not found, greetings will be synthesized live")
+            return
+        
+        voice = self.tts_engine.getProperty('voice')
+        for name in self.known_face_names:
+            greeting = self.config['greeting']['custom_greetings'].get(name, f"Hello {name}!")
+            key = hashlib.sha1(f"{voice}:{greeting}".encode()).hexdigest()[:16]
+            wav_path = self.tts_cache_dir / f"{key}.wav"
+            if not wav_path.exists():
+                try:
+                    with self.tts_lock:
+                        self.tts_engine.save_to_file(greeting, str(wav_path))
+                        self.tts_engine.runAndWait()
+                except Exception as e:
+                    self.logger.warning(f"Could not pre-render greeting for {name}: {e}")
+                    continue
+            if wav_path.exists():
+                self.greeting_wavs[greeting] = wav_path
+    
     def process_tts_queue(self):
         """Process text-to-speech queue"""
         while True:
             try:
                 message = self.tts_queue.get(timeout=1)
-                if message and hasattr(self, 'tts_engine'):
-                    # Ensure we're at full volume for each message
-                    self.tts_engine.setProperty('volume', 1.0)
-                    self.tts_engine.say(message)
-                    self.tts_engine.runAndWait()
+                wav_path = self.greeting_wavs.get(message)
+                if wav_path is not None:
+                    # Pre-rendered greeting: just play the PCM
+                    subprocess.run(['aplay', '-q', str(wav_path)], check=False)
+                elif message and hasattr(self, 'tts_engine'):
+                    with self.tts_lock:
+                        # Ensure we're at full volume for each message
+                        self.tts_engine.setProperty('volume', 1.0)
+                        self.tts_engine.say(message)
+                        self.tts_engine.runAndWait()
                 self.tts_queue.task_done()
             except queue.Empty:
                 continue
@@ -294,16 +586,25 @@ class FacialRecognitionSystem:
             self.logger.error(f"Failed to queue speech: {e}")
             print(f"Speech error: {str(e)}")
     
-    def get_frame(self):
-        """Get frame from camera with error recovery"""
+    def get_frame(self, decode=True):
+        """
+        Grab frame from camera with error recovery
+        
+        With decode False the frame is only grabbed, which keeps the driver
+        queue drained without paying for the BGR conversion; (True, None)
+        is returned then.
+        """
         if not hasattr(self, 'camera') or not self.camera.isOpened():
             self.logger.error("Camera not initialized or closed")
             return False, None
             
         for _ in range(3):  # Try up to 3 times
-            ret, frame = self.camera.read()
-            if ret and frame is not None:
-                return True, frame
+            if self.camera.grab():
+                if not decode:
+                    return True, None
+                ret, frame = self.camera.retrieve()
+                if ret and frame is not None:
+                    return True, frame
             self.logger.warning("Failed to capture frame, retrying...")
             time.sleep(0.1)  # Short delay between retries
             
@@ -311,75 +612,254 @@ class FacialRecognitionSystem:
         self.logger.error("Failed to capture frame after 3 attempts")
         return False, None
     
+    def capture_loop(self):
+        """Grab frames at camera rate, decoding one only when recognition is ready"""
+        while self.running:
+            # Every frame is grabbed so the next decode is the newest, but
+            # only retrieved once recognition has taken the previous one
+            ret, frame = self.get_frame(decode=self.frame_q.empty())
+            if not ret:
+                time.sleep(0.1)
+                continue
+            if frame is not None:
+                self.put_latest(self.frame_q, frame)
+    
+    def put_latest(self, frame_queue, item):
+        """Put item on a single-slot queue, replacing any stale entry"""
+        try:
+            frame_queue.put_nowait(item)
+        except queue.Full:
+            # Consumer is behind: drop the stale entry for this one
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            frame_queue.put_nowait(item)
+    
+    def recognition_loop(self):
+        """Recognition thread: process the newest frame and hand it to the display"""
+        while self.running:
+            try:
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.load_known_faces()
+                    print(f"Loaded {len(self.known_face_names)} known faces")
+                    if self.known_face_names:
+                        print("Known people:", ", ".join(self.known_face_names))
+                    print("\nWaiting for faces...")
+                
+                try:
+                    frame = self.frame_q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                
+                overlays = self.process_frame(frame)
+                
+                # Update performance stats
+                stats = None
+                if self.show_stats:
+                    self.frame_times.append(time.time())
+                    stats = self.update_performance_stats()
+                
+                self.put_latest(self.display_q, (frame, overlays, stats))
+            except Exception as e:
+                self.logger.error(f"Error in recognition loop: {e}")
+                time.sleep(1)  # Prevent rapid error loops
+    
     def process_frame(self, frame):
-        """Process a single frame"""
-        # Convert frame to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        """Process a single frame, returning the overlays to draw on it"""
+        # Detect on a downscaled copy; detector cost scales with pixel count
+        scale = self.detection_scale
+        if self.use_opencl:
+            # Detectors need a host array, so download just the small result
+            small_bgr = cv2.resize(cv2.UMat(frame), (0, 0), fx=scale, fy=scale,
+                                   interpolation=cv2.INTER_AREA).get()
+        else:
+            small_bgr = cv2.resize(frame, (0, 0), fx=scale, fy=scale,
+                                   interpolation=cv2.INTER_AREA)
         
         # Find faces in frame
-        locations = face_recognition.face_locations(
-            rgb_frame,
-            model=self.config['recognition']['model']
-        )
+        small_locations = self.detect_faces(small_bgr)
+        
+        if not small_locations:
+            return []
         
-        if not locations:
-            return frame
+        # Scale boxes back up; encodings, drawing and crops use the full frame
+        height, width = frame.shape[:2]
+        locations = [
+            (min(height, int(top / scale)), min(width, int(right / scale)),
+             min(height, int(bottom / scale)), min(width, int(left / scale)))
+            for top, right, bottom, left in small_locations
+        ]
+        
+        # Unknown faces part-way through the capture sequence only need their
+        # counter bumped; the encoding is needed again on the saving frame
+        overlays = []
+        pending = []
+        for location in locations:
+            if self.is_counting_unknown(location):
+                overlays.append(self.handle_face("Unknown", None, location, frame))
+            else:
+                pending.append(location)
+        if not pending:
+            return overlays
         
         # Get face encodings
-        encodings = face_recognition.face_encodings(
-            rgb_frame,
-            locations,
+        encodings = self.encode_faces(frame, pending)
+        
+        # Identify all faces at once, then process each
+        names = self.identify_batch(encodings)
+        for encoding, location, name in zip(encodings, pending, names):
+            overlays.append(self.handle_face(name, encoding, location, frame))
+        
+        return overlays
+    
+    def encode_faces(self, frame, locations):
+        """Encode faces in one call from an RGB copy of only the region holding them"""
+        # Converting the region around the faces instead of the whole frame
+        # avoids a full-frame copy; padding keeps each face's landmarks inside
+        height, width = frame.shape[:2]
+        pad = max(bottom - top for top, _, bottom, _ in locations) // 2
+        region_top = max(0, min(top for top, _, _, _ in locations) - pad)
+        region_bottom = min(height, max(bottom for _, _, bottom, _ in locations) + pad)
+        region_left = max(0, min(left for _, _, _, left in locations) - pad)
+        region_right = min(width, max(right for _, right, _, _ in locations) + pad)
+        region = cv2.cvtColor(frame[region_top:region_bottom, region_left:region_right],
+                              cv2.COLOR_BGR2RGB)
+        return face_recognition.face_encodings(
+            region,
+            [(top - region_top, right - region_left, bottom - region_top, left - region_left)
+             for top, right, bottom, left in locations],
             num_jitters=1  # Increase for better accuracy, but slower
         )
+    
+    def detect_faces(self, bgr_frame):
+        """Return (top, right, bottom, left) face boxes from YuNet or dlib"""
+        if self.detector is None:
+            # dlib needs RGB; only the small detection frame is converted
+            return face_recognition.face_locations(
+                cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB),
+                model=self.rec_model
+            )
+        
+        # YuNet works on the BGR frame directly
+        height, width = bgr_frame.shape[:2]
+        if self.detector_input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self.detector_input_size = (width, height)
         
-        # Process each face
-        for encoding, location in zip(encodings, locations):
-            name = self.identify_face(encoding)
-            self.handle_face(name, encoding, location, frame)
+        _, detections = self.detector.detect(bgr_frame)
+        if detections is None:
+            return []
         
-        return frame
+        locations = []
+        for left, top, box_width, box_height in detections[:, :4].astype(int):
+            top, left = max(0, top), max(0, left)
+            bottom, right = min(height, top + box_height), min(width, left + box_width)
+            if bottom > top and right > left:
+                locations.append((int(top), int(right), int(bottom), int(left)))
+        return locations
     
     def identify_face(self, face_encoding):
         """Identify a face encoding"""
-        if not self.known_face_encodings:
+        if not len(self.known_matrix):
             return "Unknown"
         
-        if self.config['security']['encrypt_faces']:
-            face_encoding = self.encrypt_encoding(face_encoding)
-        
-        matches = face_recognition.compare_faces(
-            self.known_face_encodings,
-            face_encoding,
-            tolerance=self.config['recognition']['tolerance']
-        )
+        # One pass over all known faces instead of compare_faces followed by
+        # face_distance, JIT-compiled when numba is installed
+        q = np.ascontiguousarray(face_encoding, dtype=np.float32)
+        if self.known_matrix_i8 is not None:
+            return self.identify_face_i8(q)
+        if numba is not None:
+            best_match_index, best_distance = best_match(self.known_matrix, q)
+        else:
+            distances = np.linalg.norm(self.known_matrix - q, axis=1)
+            best_match_index = int(distances.argmin())
+            best_distance = distances[best_match_index]
+        if best_distance <= self.rec_tolerance:
+            return self.known_face_names[best_match_index]
         
-        if True in matches:
-            face_distances = face_recognition.face_distance(
-                self.known_face_encodings,
-                face_encoding
-            )
-            best_match_index = np.argmin(face_distances)
-            if matches[best_match_index]:
-                return self.known_face_names[best_match_index]
+        return "Unknown"
+    
+    def identify_batch(self, encodings):
+        """Identify all encodings of a frame with one (K, N) distance matrix"""
+        if not len(encodings):
+            return []
+        if not len(self.known_matrix):
+            return ["Unknown"] * len(encodings)
+        if self.known_matrix_i8 is not None:
+            return [self.identify_face(encoding) for encoding in encodings]
         
+        E = np.asarray(encodings, dtype=np.float32)
+        # One gemm for all K x N squared distances
+        distances_sq = ((E ** 2).sum(axis=1)[:, None] + self.known_norms_sq[None, :]
+                        - 2 * (E @ self.known_matrix.T))
+        best = distances_sq.argmin(axis=1)
+        best_distances_sq = distances_sq[np.arange(len(E)), best]
+        tolerance_sq = self.rec_tolerance ** 2
+        return [self.known_face_names[i] if d <= tolerance_sq else "Unknown"
+                for i, d in zip(best, best_distances_sq)]
+    
+    def identify_face_i8(self, q):
+        """Identify against the int8 matrix, comparing in quantized units"""
+        q_i8 = np.clip(np.round(q / self.quant_scale), -127, 127).astype(np.int8)
+        if numba is not None:
+            best_match_index, best_distance_sq = best_match_i8(self.known_matrix_i8, q_i8)
+        else:
+            diffs = self.known_matrix_i8.astype(np.int32) - q_i8
+            distances_sq = np.einsum('ij,ij->i', diffs, diffs)
+            best_match_index = int(distances_sq.argmin())
+            best_distance_sq = distances_sq[best_match_index]
+        if best_distance_sq <= self.quant_tolerance_sq:
+            return self.known_face_names[best_match_index]
         return "Unknown"
     
+    @staticmethod
+    def box_iou(a, b):
+        """Intersection over union of two (top, right, bottom, left) boxes"""
+        inter_h = min(a[2], b[2]) - max(a[0], b[0])
+        inter_w = min(a[1], b[1]) - max(a[3], b[3])
+        if inter_h <= 0 or inter_w <= 0:
+            return 0.0
+        inter = inter_h * inter_w
+        union = (a[2] - a[0]) * (a[1] - a[3]) + (b[2] - b[0]) * (b[1] - b[3]) - inter
+        return inter / union if union > 0 else 0.0
+    
+    def match_unknown_track(self, face_location, min_iou=0.3, max_age=2.0):
+        """Return the unknown-face track best overlapping this box, or None"""
+        current_time = time.time()
+        self.unknown_tracks = [t for t in self.unknown_tracks
+                               if current_time - t['last'] <= max_age]
+        best_track, best_iou = None, min_iou
+        for track in self.unknown_tracks:
+            iou = self.box_iou(face_location, track['bbox'])
+            if iou >= best_iou:
+                best_track, best_iou = track, iou
+        return best_track
+    
+    def is_counting_unknown(self, face_location):
+        """True if this face's next frame cannot yet trigger a save"""
+        track = self.match_unknown_track(face_location)
+        return track is not None and not track['saved'] and track['count'] < 4
+    
     def handle_face(self, name, face_encoding, face_location, frame):
-        """Handle detected face"""
-        # Draw rectangle and name
-        top, right, bottom, left = face_location
-        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-        
-        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
-        cv2.putText(frame, name, (left + 6, bottom - 6),
-                   cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-        
+        """Handle detected face, returning its overlay for the display thread"""
         # Handle greeting
         if name != "Unknown":
             self.handle_known_face(name)
         else:
             self.handle_unknown_face(face_encoding, face_location, frame)
+        
+        color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+        return Overlay(face_location, name, color)
+    
+    def draw_overlay(self, frame, overlay):
+        """Draw face box and name label"""
+        top, right, bottom, left = overlay.location
+        cv2.rectangle(frame, (left, top), (right, bottom), overlay.color, 2)
+        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), overlay.color, cv2.FILLED)
+        cv2.putText(frame, overlay.name, (left + 6, bottom - 6),
+                   cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
     
     def handle_known_face(self, name):
         """Handle known face detection"""
@@ -389,11 +869,11 @@ class FacialRecognitionSystem:
         # Always print when we see a known face
         print(f"\nRecognized: {name}")
         
-        if current_time - last_greeting > self.config['greeting']['cooldown']:
+        if current_time - last_greeting > self.greet_cooldown:
             self.last_greeting_time[name] = current_time
             
             # Get custom greeting if available
-            greeting = self.config['greeting']['custom_greetings'].get(
+            greeting = self.custom_greetings.get(
                 name,
                 f"Hello {name}!"
             )
@@ -403,7 +883,7 @@ class FacialRecognitionSystem:
             print(f"{greeting}")
             
             # Audio greeting if enabled
-            if self.config['greeting']['enabled']:
+            if self.greet_enabled:
                 self.speak_async(greeting)
     
     def handle_unknown_face(self, face_encoding, face_location, frame):
@@ -411,31 +891,37 @@ class FacialRecognitionSystem:
         # Always print when we see an unknown face
         print("\nUnknown face detected!")
         
-        face_key = str(face_location)
-        if face_key not in self.unknown_face_counters:
-            self.unknown_face_counters[face_key] = 0
+        # Follow the face across frames by box overlap, so jitter and slow
+        # movement keep the same capture sequence going
+        track = self.match_unknown_track(face_location)
+        if track is None:
+            track = {'bbox': face_location, 'count': 0, 'last': 0.0, 'saved': False}
+            self.unknown_tracks.append(track)
             print("Starting face capture sequence...")
+        track['bbox'] = face_location
+        track['last'] = time.time()
+        if track['saved']:
+            return
         
-        self.unknown_face_counters[face_key] += 1
-        print(f"Capture progress: {self.unknown_face_counters[face_key]}/5 frames")
+        track['count'] += 1
+        print(f"Capture progress: {track['count']}/5 frames")
         
         # Save unknown face after seeing it a few times (to ensure good quality)
-        if self.unknown_face_counters[face_key] >= 5:  # 5 frames for quick capture
-            if face_key not in self.unknown_face_counters or self.unknown_face_counters[face_key] != -1000:  # Check if not already saved
-                face_id = self.save_unknown_face(frame, face_location, face_encoding)
-                if face_id:
-                    print(f"\nSaved new face as ID: {face_id}")
-                    print(f"Photo saved to: data/unknown_faces/unknown_*_{face_id}.jpg")
-                    print("To name this person:")
-                    print(f"1. Copy their photo: cp data/unknown_faces/unknown_*_{face_id}.jpg data/known_faces/PersonName.jpg")
-                    print("2. Press 'r' to reload known faces")
-                    # Announce new face saved
-                    if self.config['greeting']['enabled']:
-                        self.speak_async("New face detected and saved")
-                self.unknown_face_counters[face_key] = -1000  # Mark as saved
+        if track['count'] >= 5 and face_encoding is not None:  # 5 frames for quick capture
+            face_id = self.save_unknown_face(frame, face_location, face_encoding)
+            if face_id:
+                print(f"\nSaved new face as ID: {face_id}")
+                print(f"Photo saved to: data/unknown_faces/unknown_*_{face_id}.jpg")
+                print("To name this person:")
+                print(f"1. Copy their photo: cp data/unknown_faces/unknown_*_{face_id}.jpg data/known_faces/PersonName.jpg")
+                print("2. Press 'r' to reload known faces")
+                # Announce new face saved
+                if self.greet_enabled:
+                    self.speak_async("New face detected and saved")
+            track['saved'] = True
     
     def save_unknown_face(self, frame, face_location, face_encoding):
-        """Save unknown face and return face_id"""
+        """Queue an unknown face for the writer thread and return its face_id"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             face_id = str(uuid.uuid4())[:8]
@@ -451,9 +937,9 @@ class FacialRecognitionSystem:
             left = max(0, left - padding)
             right = min(width, right + padding)
             
-            face_image = frame[top:bottom, left:right]
+            # Copy: the display thread draws on the frame after recognition
+            face_image = frame[top:bottom, left:right].copy()
             face_path = self.unknown_faces_dir / filename
-            cv2.imwrite(str(face_path), face_image)
             
             # Save metadata
             metadata = {
@@ -461,52 +947,72 @@ class FacialRecognitionSystem:
                 "face_id": face_id,
                 "filename": filename,
                 "encoding": face_encoding.tolist() if not self.config['security']['encrypt_faces']
-                          else self.encrypt_encoding(face_encoding).tolist()
+                          else self.encrypt_encoding(face_encoding).decode()
             }
             
             metadata_file = self.unknown_faces_dir / f"{face_id}_meta.json"
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f)
             
-            self.logger.info(f"Saved unknown face: {face_id}")
+            # JPEG encoding and SD card writes happen off the recognition thread
+            self.save_q.put_nowait((face_image, metadata, face_path, metadata_file))
             return face_id
             
         except Exception as e:
             self.logger.error(f"Error saving unknown face: {e}")
             return None
     
+    def save_worker(self):
+        """Writer thread: write queued unknown-face images and metadata to disk"""
+        while True:
+            face_image, metadata, face_path, metadata_file = self.save_q.get()
+            try:
+                cv2.imwrite(str(face_path), face_image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                with open(metadata_file, 'w') as f:
+                    json.dump(metadata, f)
+                self.logger.info(f"Saved unknown face: {metadata['face_id']}")
+            except Exception as e:
+                self.logger.error(f"Error saving unknown face: {e}")
+            finally:
+                self.save_q.task_done()
+    
     def encrypt_encoding(self, encoding):
-        """Encrypt face encoding"""
-        if not self.config['security']['encrypt_faces']:
-            return encoding
-        try:
-            data = json.dumps(encoding.tolist()).encode()
-            return np.array(json.loads(
-                self.cipher.encrypt(data).decode()
-            ))
-        except Exception as e:
-            self.logger.error(f"Encryption error: {e}")
-            return encoding
+        """Encrypt face encoding for storage at rest, returning a Fernet token"""
+        return self.cipher.encrypt(np.asarray(encoding, dtype=np.float32).tobytes())
+    
+    def decrypt_encoding(self, token):
+        """Decrypt a Fernet token produced by encrypt_encoding"""
+        return np.frombuffer(self.cipher.decrypt(token), dtype=np.float32)
     
     def update_performance_stats(self):
-        """Update performance statistics"""
-        if len(self.frame_times) > 30:
-            self.frame_times.pop(0)
-        
-        if self.frame_times:
-            fps = len(self.frame_times) / (self.frame_times[-1] - self.frame_times[0])
-            cpu_percent = psutil.cpu_percent()
-            memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+        """Update performance statistics, re-sampling at most 4 times a second"""
+        current_time = time.time()
+        if current_time - self.last_stats_time < 0.25:
+            return self.cached_stats
+        
+        span = self.frame_times[-1] - self.frame_times[0] if len(self.frame_times) > 1 else 0
+        if span > 0:
+            # N timestamps bound N - 1 frame intervals
+            fps = (len(self.frame_times) - 1) / span
+            # Non-blocking: CPU use since the previous call
+            cpu_percent = psutil.cpu_percent(interval=None)
+            memory = self.process.memory_info().rss / 1024 / 1024  # MB
             
-            return f"FPS: {fps:.1f} | CPU: {cpu_percent}% | Memory: {memory:.1f}MB"
-        return ""
+            self.cached_stats = f"FPS: {fps:.1f} | CPU: {cpu_percent}% | Memory: {memory:.1f}MB"
+            self.last_stats_time = current_time
+        return self.cached_stats
     
     def cleanup(self):
         """Clean up resources"""
         self.logger.info("Cleaning up...")
+        self.running = False
+        for thread_name in ('capture_thread', 'recognition_thread'):
+            if hasattr(self, thread_name):
+                getattr(self, thread_name).join(timeout=5)
         self.camera.release()
         cv2.destroyAllWindows()
         
+        # Let queued unknown-face writes finish
+        self.save_q.join()
+        
         if self.config['greeting']['enabled']:
             self.tts_queue.join()
     
@@ -529,32 +1035,38 @@ class FacialRecognitionSystem:
         print("  3. Press 'r' to reload\n")
         
         # Test audio at startup
-        if self.config['greeting']['enabled']:
+        if self.greet_enabled:
             self.speak_async("System ready")
         
         if self.known_face_names:
             print("Currently known people:", ", ".join(self.known_face_names))
         print("\nWaiting for faces...")
         
+        # The camera is drained on its own thread so it never queues stale
+        # frames while a frame is being recognized; recognition runs on a
+        # second thread so this one only draws, displays and reads keys
+        self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.recognition_thread = threading.Thread(target=self.recognition_loop, daemon=True)
+        self.capture_thread.start()
+        self.recognition_thread.start()
+        
         while self.running:
             try:
-                # Capture frame
-                ret, frame = self.get_frame()
-                if not ret:
-                    continue
-                
-                # Process frame
-                frame = self.process_frame(frame)
+                # Wait for the newest recognized frame
+                try:
+                    frame, overlays, stats = self.display_q.get(timeout=0.1)
+                except queue.Empty:
+                    frame = None
                 
-                # Update performance stats
-                if self.show_stats:
-                    self.frame_times.append(time.time())
-                    stats = self.update_performance_stats()
-                    cv2.putText(frame, stats, (10, 30),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                
-                # Display frame
-                cv2.imshow('Facial Recognition System', frame)
+                if frame is not None:
+                    for overlay in overlays:
+                        self.draw_overlay(frame, overlay)
+                    if stats:
+                        cv2.putText(frame, stats, (10, 30),
+                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    
+                    # Display frame
+                    cv2.imshow('Facial Recognition System', frame)
                 
                 # Handle key presses
                 key = cv2.waitKey(1) & 0xFF
@@ -563,18 +1075,15 @@ class FacialRecognitionSystem:
                     self.running = False
                 elif key == ord('r'):
                     print("\nReloading known faces...")
-                    self.load_known_faces()
-                    print(f"Loaded {len(self.known_face_names)} known faces")
-                    if self.known_face_names:
-                        print("Known people:", ", ".join(self.known_face_names))
-                    print("\nWaiting for faces...")
+                    # Done on the recognition thread, between frames
+                    self.reload_requested = True
                 elif key == ord('s'):
                     self.show_stats = not self.show_stats
                 elif key == ord('v'):
-                    self.config['greeting']['enabled'] = not self.config['greeting']['enabled']
-                    status = "enabled" if self.config['greeting']['enabled'] else "disabled"
+                    self.greet_enabled = not self.greet_enabled
+                    status = "enabled" if self.greet_enabled else "disabled"
                     print(f"\nVoice output {status}")
-                    if self.config['greeting']['enabled']:
+                    if self.greet_enabled:
                         self.speak_async("Voice output enabled")
                 
             except Exception as e:
@@ -97,13 +97,34 @@ install_system_deps() {
         espeak \
         || true
 
-    # Install dlib from source
+    # Install dlib from source, vectorized and linked against OpenBLAS
     log "Installing dlib from source..."
     if [ ! -d "dlib" ]; then
         git clone https://github.com/davisking/dlib.git
     fi
     cd dlib
-    python3 setup.py install --prefix=/usr/local
+    DLIB_FLAGS="-O3 -ftree-vectorize"
+    case "$(uname -m)" in
+        armv7l)
+            DLIB_FLAGS="$DLIB_FLAGS -mfpu=neon -mfloat-abi=hard"
+            DLIB_SIMD="--set USE_NEON_INSTRUCTIONS=ON"
+            ;;
+        aarch64)
+            DLIB_SIMD="--set USE_NEON_INSTRUCTIONS=ON"
+            ;;
+        x86_64)
+            DLIB_SIMD="--set USE_SSE4_INSTRUCTIONS=ON --set USE_AVX_INSTRUCTIONS=ON"
+            ;;
+        *)
+            DLIB_SIMD=""
+            ;;
+    esac
+    python3 setup.py install --prefix=/usr/local \
+        --set DLIB_NO_GUI_SUPPORT=YES \
+        --set DLIB_USE_BLAS=ON \
+        --set DLIB_USE_LAPACK=ON \
+        $DLIB_SIMD \
+        --compiler-flags "$DLIB_FLAGS"
     cd ..
     rm -rf dlib
 
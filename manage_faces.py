@@ -5,22 +5,108 @@ Implements face database operations, validation, and maintenance functions
 """
 
 import os
+import re
+import fcntl
+import tempfile
+import string
 import sys
 import json
 import shutil
+import sqlite3
+import threading
 import yaml
-import face_recognition
-import cv2
 import click
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from PIL import Image
 from logging.handlers import RotatingFileHandler
 
+try:
+    import imagesize  # Optional: header-only dimension reads
+except ImportError:
+    imagesize = None
+
+try:
+    import orjson  # Optional: faster metadata (de)serialization
+except ImportError:
+    orjson = None
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg')
+
+# Long side images are shrunk to before face detection
+DETECTION_MAX_SIDE = 480
+
+# Characters sanitize_name keeps: ASCII names go through a C-level translate
+# table, anything else through a precompiled Unicode-aware pattern
+_NAME_CHARS = set(string.ascii_letters + string.digits + ' -_')
+_NAME_TRANS = str.maketrans('', '', ''.join(chr(i) for i in range(128) if chr(i) not in _NAME_CHARS))
+_NAME_STRIP_RE = re.compile(r'[^\w\- ]')
+
+# Prefer the libyaml C parser when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Parsed config.yml keyed by path -> ((file mtime_ns, size), config)
+_CONFIG_CACHE = {}
+
+def read_config(path='config.yml'):
+    """
+    Load a YAML config file, reusing the last parse while it is unchanged
+    
+    Parameters:
+        path (str): Path to the config file
+        
+    Returns:
+        dict: Parsed configuration
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _CONFIG_CACHE.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    
+    with open(path, 'r') as f:
+        config = yaml.load(f, Loader=_YAML_LOADER)
+    _CONFIG_CACHE[path] = (key, config)
+    return config
+
+def _is_known_image(entry):
+    """Check whether a directory entry is a registered face image"""
+    return entry.is_file() and entry.name.rsplit('.', 1)[-1].lower() in IMAGE_EXTENSIONS
+
+def _is_unknown_image(entry):
+    """Check whether a directory entry is a captured unknown face"""
+    return entry.is_file() and entry.name.startswith('unknown_') and entry.name.endswith('.jpg')
+
+def load_json(path):
+    """Read a JSON file, with orjson when available"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def dump_json(data, path):
+    """Write a JSON file with two-space indentation"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+def dumps_json(data):
+    """Serialize to a compact JSON string"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+# Listing results keyed by directory path -> (directory mtime_ns, faces)
+_FACES_CACHE = {}
+
 class FaceManager:
     def __init__(self):
         """Initialize face management system"""
+        self._index_lock = threading.Lock()
         self.setup_logging()
         self.load_config()
         self.setup_paths()
@@ -29,6 +115,9 @@ class FaceManager:
         """Set up logging configuration"""
         self.logger = logging.getLogger('FaceManager')
         self.logger.setLevel(logging.INFO)
+        if self.logger.handlers:
+            # Already configured by an earlier instance
+            return
         
         # File handler
         log_file = '/var/log/facial-recognition/manager.log'
@@ -53,8 +142,7 @@ class FaceManager:
     def load_config(self):
         """Load configuration from YAML file"""
         try:
-            with open('config.yml', 'r') as f:
-                self.config = yaml.safe_load(f)
+            self.config = read_config('config.yml')
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
             sys.exit(1)
@@ -67,62 +155,133 @@ class FaceManager:
         self.unknown_faces_dir = Path(storage_config['unknown_faces_dir'])
         self.logs_dir = Path(storage_config['logs_dir'])
         
+        # The unknown-face index lives outside unknown_faces_dir so its
+        # journal files do not bump that directory's mtime (and are not
+        # hardlinked into backups)
+        self.index_path = self.base_dir / 'unknown_faces.db'
+        self._index = None
+        self._index_mtime = None
+        
+        # Known-face encodings cache, shared with face_recognition.py
+        self.encodings_path = self.base_dir / 'encodings.npz'
+        self._encodings = None
+        self._encodings_mtime = None
+        
         # Create directories if they don't exist
-        for directory in [self.known_faces_dir, self.unknown_faces_dir, self.logs_dir]:
+        for directory in [self.base_dir, self.known_faces_dir, self.unknown_faces_dir, self.logs_dir]:
             directory.mkdir(parents=True, exist_ok=True)
     
-    def validate_image(self, image_path):
+    def validate_image(self, image):
         """
         Validate image file and perform face detection
         
         Parameters:
-            image_path (str): Path to image file
+            image (str or bytes): Path to image file, or its encoded contents
             
         Returns:
             bool: True if image contains exactly one valid face
         """
         try:
-            # Check if file exists and is an image
-            if not os.path.exists(image_path):
-                raise ValueError("Image file does not exist")
-            
-            # Try to open with PIL to validate image
-            try:
-                with Image.open(image_path) as img:
-                    img.verify()
-            except Exception:
-                raise ValueError("Invalid image file")
-            
-            # Load image and check for faces
-            image = face_recognition.load_image_file(image_path)
-            face_locations = face_recognition.face_locations(image)
-            
-            if not face_locations:
-                raise ValueError("No face detected in image")
-            
-            if len(face_locations) > 1:
-                raise ValueError("Multiple faces detected in image")
-            
-            # Check image quality
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            blur_value = cv2.Laplacian(gray, cv2.CV_64F).var()
-            
-            if blur_value < self.config['recognition']['blur_threshold']:
-                raise ValueError("Image is too blurry")
-            
+            self.analyze_image(image)
             return True
-        
         except Exception as e:
             self.logger.error(f"Image validation failed: {e}")
             return False
     
-    def add_face(self, name, image_path):
+    def analyze_image(self, image, encode=False):
+        """
+        Check an image holds exactly one sharp face, raising ValueError if not
+        
+        Parameters:
+            image (str or bytes): Path to image file, or its encoded contents
+            encode (bool): Also compute the face encoding
+            
+        Returns:
+            numpy.ndarray: 128-d face encoding when encode is set, else None
+        """
+        # Imported here so listing/cleaning commands skip loading dlib
+        import cv2
+        import face_recognition
+        import numpy as np
+        
+        min_size = self.config['recognition'].get('min_face_size', 0)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # In-memory upload: decode straight from the buffer
+            data = np.frombuffer(image, dtype=np.uint8)
+        else:
+            # Check if file exists and is an image
+            if not os.path.exists(image):
+                raise ValueError("Image file does not exist")
+            
+            # Reject unreadable or undersized files from the header alone
+            # before paying for a full decode and face detection
+            if imagesize is not None:
+                width, height = imagesize.get(image)
+                if (width, height) == (-1, -1):
+                    raise ValueError("Invalid image file")
+                if width < min_size or height < min_size:
+                    raise ValueError("Image is too small")
+            data = np.fromfile(image, dtype=np.uint8)
+        
+        # Decode once with OpenCV and reuse the array for every check;
+        # imdecode returns None for anything it cannot parse
+        bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError("Invalid image file")
+        if min(bgr.shape[:2]) < min_size:
+            raise ValueError("Image is too small")
+        
+        # Check image quality
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        blur_value = cv2.Laplacian(gray, cv2.CV_64F).var()
+        
+        if blur_value < self.config['recognition']['blur_threshold']:
+            raise ValueError("Image is too blurry")
+        
+        # Check for faces; HOG cost is linear in pixel count, so detect
+        # on a copy capped at DETECTION_MAX_SIDE first. Both passes use the
+        # default single upsample, and a face too small to survive the
+        # downscale is looked for again at full resolution before rejecting.
+        scale = DETECTION_MAX_SIDE / max(bgr.shape[:2])
+        face_locations = []
+        if scale < 1:
+            small = cv2.resize(bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            face_locations = face_recognition.face_locations(
+                cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            )
+        if not face_locations:
+            scale = 1
+            face_locations = face_recognition.face_locations(
+                cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            )
+        
+        if not face_locations:
+            raise ValueError("No face detected in image")
+        
+        if len(face_locations) > 1:
+            raise ValueError("Multiple faces detected in image")
+        
+        if not encode:
+            return None
+        # Landmarks and encoding use the full-resolution image
+        top, right, bottom, left = face_locations[0]
+        if scale < 1:
+            height, width = bgr.shape[:2]
+            top, left = int(top / scale), int(left / scale)
+            bottom = min(height, int(bottom / scale))
+            right = min(width, int(right / scale))
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        return face_recognition.face_encodings(rgb, [(top, right, bottom, left)])[0]
+    
+    def add_face(self, name, image, file_ext=None):
         """
         Register new face in the database
         
         Parameters:
             name (str): Identifier for the face
-            image_path (str): Path to face image
+            image (str or bytes): Path to face image, or its encoded contents
+            file_ext (str): Extension to store in-memory images under
+                (e.g. '.png'); paths keep their own extension
             
         Returns:
             bool: True if registration successful
@@ -134,18 +293,29 @@ class FaceManager:
                 raise ValueError("Invalid name")
             
             # Check if name already exists
-            existing_faces = [f.stem for f in self.known_faces_dir.glob('*.*')]
-            if name in existing_faces:
+            if self.find_known_face(name):
                 raise ValueError(f"Face with name '{name}' already exists")
             
-            # Validate image
-            if not self.validate_image(image_path):
+            in_memory = isinstance(image, (bytes, bytearray, memoryview))
+            if in_memory:
+                file_ext = (file_ext or '.jpg').lower()
+                if file_ext.lstrip('.') not in IMAGE_EXTENSIONS:
+                    raise ValueError(f"Unsupported image type '{file_ext}'")
+            
+            # Validate image, keeping the encoding for the shared cache
+            try:
+                encoding = self.analyze_image(image, encode=self.shares_encodings())
+            except Exception as e:
+                self.logger.error(f"Image validation failed: {e}")
                 raise ValueError("Image validation failed")
             
-            # Copy image to known faces directory
-            file_ext = os.path.splitext(image_path)[1].lower()
+            # Copy image to known faces directory; uploads are only written
+            # once they have passed validation
+            if not in_memory:
+                file_ext = os.path.splitext(image)[1].lower()
             new_path = self.known_faces_dir / f"{name}{file_ext}"
-            shutil.copy2(image_path, new_path)
+            self._install_known_file(image, new_path)
+            self.store_encoding(new_path, encoding)
             
             self.logger.info(f"Successfully added face for {name}")
             return True
@@ -154,6 +324,32 @@ class FaceManager:
             self.logger.error(f"Error adding face: {e}")
             return False
     
+    def _install_known_file(self, image, new_path):
+        """
+        Write a known face image through a temp file and os.replace
+        
+        Backups hardlink these images, so they must never be rewritten in
+        place: the new image always gets a new inode.
+        
+        Parameters:
+            image (str or bytes): Source image path, or its encoded contents
+            new_path (Path): Destination in known_faces_dir
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.known_faces_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(image, (bytes, bytearray, memoryview)):
+                    f.write(image)
+                    os.chmod(tmp_path, 0o644)
+                else:
+                    with open(image, 'rb') as src:
+                        shutil.copyfileobj(src, f)
+                    shutil.copystat(image, tmp_path)
+            os.replace(tmp_path, new_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
     def remove_face(self, name):
         """
         Remove face registration from database
@@ -166,24 +362,155 @@ class FaceManager:
         """
         try:
             name = self.sanitize_name(name)
-            found = False
-            
-            for face_file in self.known_faces_dir.glob('*.*'):
-                if face_file.stem == name:
-                    face_file.unlink()
-                    found = True
-                    self.logger.info(f"Removed face: {name}")
-                    break
+            face_file = self.find_known_face(name)
             
-            if not found:
+            if not face_file:
                 raise ValueError(f"Face '{name}' not found")
             
+            face_file.unlink()
+            self.store_encoding(face_file, None)
+            self.logger.info(f"Removed face: {name}")
             return True
             
         except Exception as e:
             self.logger.error(f"Error removing face: {e}")
             return False
     
+    def find_known_face(self, name):
+        """
+        Locate the image file registered under a name
+        
+        Parameters:
+            name (str): Sanitized face identifier
+            
+        Returns:
+            Path: Image path, or None if the name is not registered
+        """
+        # add_face always writes {name}{ext}, so probe the legal extensions
+        # directly instead of listing the directory; hand-copied photos are
+        # often Name.JPG, so try the uppercase spelling too
+        for ext in IMAGE_EXTENSIONS:
+            for suffix in (ext, ext.upper()):
+                face_file = self.known_faces_dir / f"{name}.{suffix}"
+                if face_file.is_file():
+                    return face_file
+        # Mixed-case extensions (.Jpg) are rare enough for one listing
+        with os.scandir(self.known_faces_dir) as it:
+            for entry in it:
+                if os.path.splitext(entry.name)[0] == name and _is_known_image(entry):
+                    return self.known_faces_dir / entry.name
+        return None
+    
+    def shares_encodings(self):
+        """
+        Check whether encodings computed here can go into encodings.npz
+        
+        The recognition pipeline only reuses plain dlib encodings; encrypted
+        caches and other encoder backends are left for it to rebuild.
+        """
+        return (not self.config['security']['encrypt_faces'] and
+                self.config['recognition'].get('encoder_backend', 'dlib') == 'dlib')
+    
+    def _encoding_entries(self):
+        """Load encodings.npz as {filename: (mtime_ns, size, encoding)}"""
+        try:
+            mtime_ns = os.stat(self.encodings_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if self._encodings is not None and mtime_ns == self._encodings_mtime:
+            return self._encodings
+        
+        entries = {}
+        if mtime_ns is not None and self.shares_encodings():
+            import numpy as np
+            try:
+                with np.load(self.encodings_path) as data:
+                    encrypted = 'encrypted' in data and bool(data['encrypted'])
+                    backend = str(data['backend']) if 'backend' in data else 'dlib'
+                    if not encrypted and backend == 'dlib':
+                        entries = {
+                            str(name): (int(mtime), int(size), enc)
+                            for name, mtime, size, enc in zip(
+                                data['names'], data['mtimes'], data['sizes'], data['encs']
+                            )
+                        }
+            except Exception as e:
+                self.logger.warning(f"Ignoring unreadable encodings cache: {e}")
+        self._encodings = entries
+        self._encodings_mtime = mtime_ns
+        return entries
+    
+    def get_encodings(self):
+        """
+        Known-face encodings from the shared encodings.npz cache
+        
+        The file is read once and kept in memory until it changes on disk.
+        
+        Returns:
+            dict: {name: 128-d encoding}
+        """
+        import numpy as np
+        # NaN rows mark images the pipeline found no face in
+        return {
+            os.path.splitext(name)[0]: enc
+            for name, (_, _, enc) in self._encoding_entries().items()
+            if not np.isnan(enc).any()
+        }
+    
+    def store_encoding(self, face_file, encoding):
+        """
+        Record (or, with encoding None, drop) a known face in encodings.npz
+        
+        Entries use face_recognition.py's cache layout, keyed on the image's
+        mtime and size, so the pipeline loads them instead of re-encoding.
+        
+        Parameters:
+            face_file (Path): Image in known_faces_dir
+            encoding (numpy.ndarray): Face encoding, or None to remove
+        """
+        if not self.shares_encodings():
+            return
+        try:
+            import numpy as np
+            # The recognition pipeline and other worker processes write this
+            # cache too: hold the lock across the read-modify-write
+            lock_path = self.encodings_path.with_name(self.encodings_path.name + '.lock')
+            with open(lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self._encodings = None  # reread under the lock
+                entries = dict(self._encoding_entries())
+                if encoding is None:
+                    if entries.pop(face_file.name, None) is None:
+                        return
+                else:
+                    stat = face_file.stat()
+                    entries[face_file.name] = (stat.st_mtime_ns, stat.st_size, encoding)
+                
+                names = list(entries)
+                fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix='.npz.tmp')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        np.savez(
+                            f,
+                            names=np.array(names, dtype=str),
+                            encs=np.stack([entries[n][2] for n in names]) if names else np.empty((0, 128)),
+                            encrypted=np.array(False),
+                            backend=np.array('dlib'),
+                            mtimes=np.array([entries[n][0] for n in names], dtype=np.int64),
+                            sizes=np.array([entries[n][1] for n in names], dtype=np.int64)
+                        )
+                    # mkstemp creates 0600; keep the cache readable like np.savez would
+                    os.chmod(tmp_path, 0o644)
+                    # Readers see either the old or the new cache, never a partial one
+                    os.replace(tmp_path, self.encodings_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+                self._encodings = entries
+                self._encodings_mtime = os.stat(self.encodings_path).st_mtime_ns
+        except Exception as e:
+            self.logger.warning(f"Could not update encodings cache: {e}")
+    
     def list_known_faces(self):
         """
         Enumerate registered faces in database
@@ -192,19 +519,104 @@ class FaceManager:
             list: List of dictionaries containing face data
         """
         try:
+            cache_key = ('known', str(self.known_faces_dir))
+            mtime_ns = os.stat(self.known_faces_dir).st_mtime_ns
+            cached = _FACES_CACHE.get(cache_key)
+            if cached and cached[0] == mtime_ns:
+                return list(cached[1])
+            
             faces = []
-            for face_file in sorted(self.known_faces_dir.glob('*.*')):
-                if face_file.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-                    faces.append({
-                        'name': face_file.stem,
-                        'file': face_file.name,
-                        'added': datetime.fromtimestamp(face_file.stat().st_mtime)
-                    })
-            return faces
+            with os.scandir(self.known_faces_dir) as it:
+                entries = sorted((e for e in it if _is_known_image(e)), key=lambda e: e.name)
+            for entry in entries:
+                faces.append({
+                    'name': os.path.splitext(entry.name)[0],
+                    'file': entry.name,
+                    'added': datetime.fromtimestamp(entry.stat().st_mtime)
+                })
+            _FACES_CACHE[cache_key] = (mtime_ns, faces)
+            return list(faces)
         except Exception as e:
             self.logger.error(f"Error listing known faces: {e}")
             return []
     
+    def _unknown_index(self):
+        """Open the unknown-face index, creating its table on first use"""
+        if self._index is None:
+            # Shared by the web interface's request threads under _index_lock
+            self._index = sqlite3.connect(str(self.index_path), check_same_thread=False)
+            self._index.execute(
+                "CREATE TABLE IF NOT EXISTS unknown ("
+                "face_id TEXT PRIMARY KEY, file TEXT UNIQUE, ts REAL, "
+                "meta_file TEXT, promoted_json TEXT)"
+            )
+            self._index.execute("CREATE INDEX IF NOT EXISTS unknown_ts ON unknown (ts)")
+            self._index.commit()
+        return self._index
+    
+    @staticmethod
+    def _unknown_row(entry, names):
+        """
+        Build an index row for an unknown face image
+        
+        Parameters:
+            entry (os.DirEntry): unknown_<timestamp>_<face_id>.jpg entry
+            names (set): All file names in the unknown faces directory
+            
+        Returns:
+            tuple: (face_id, file, ts, meta_file, promoted_json); meta_file is
+            None when the image has no sidecar
+        """
+        stem = entry.name[:-4]
+        face_id = stem.rsplit('_', 1)[-1]
+        # The capture scripts name the sidecar after the face ID; older
+        # layouts used the image stem
+        meta_name = next(
+            (n for n in (f"{face_id}_meta.json", f"{stem}_meta.json") if n in names), None
+        )
+        # The image is written moments before its metadata timestamp, so the
+        # mtime cached on the DirEntry stands in for it without parsing JSON
+        return (face_id, entry.name, entry.stat().st_mtime, meta_name, None)
+    
+    def sync_unknown_index(self):
+        """
+        Bring the unknown-face index up to date with unknown_faces_dir
+        
+        The recognition processes only write images and JSON sidecars, so
+        the index is refreshed from a single scandir pass whenever the
+        directory mtime changes; sidecars are never parsed. Callers must
+        hold _index_lock.
+        
+        Returns:
+            sqlite3.Connection: The up-to-date index
+        """
+        db = self._unknown_index()
+        mtime_ns = os.stat(self.unknown_faces_dir).st_mtime_ns
+        if mtime_ns == self._index_mtime:
+            return db
+        
+        with os.scandir(self.unknown_faces_dir) as it:
+            all_entries = list(it)
+        names = {e.name for e in all_entries}
+        entries = {e.name: e for e in all_entries if _is_unknown_image(e)}
+        indexed = dict(db.execute("SELECT file, meta_file FROM unknown"))
+        
+        db.executemany(
+            "DELETE FROM unknown WHERE file = ?",
+            [(name,) for name in indexed if name not in entries]
+        )
+        for name, entry in entries.items():
+            if indexed.get(name) is not None:
+                continue
+            db.execute(
+                "INSERT OR REPLACE INTO unknown (face_id, file, ts, meta_file, promoted_json) "
+                "VALUES (?, ?, ?, ?, ?)", self._unknown_row(entry, names)
+            )
+        db.commit()
+        
+        self._index_mtime = mtime_ns
+        return db
+    
     def list_unknown_faces(self):
         """
         Enumerate unidentified faces in database
@@ -213,18 +625,17 @@ class FaceManager:
             list: List of dictionaries containing face data
         """
         try:
-            faces = []
-            for face_file in sorted(self.unknown_faces_dir.glob('unknown_*.jpg')):
-                meta_file = self.unknown_faces_dir / f"{face_file.stem}_meta.json"
-                if meta_file.exists():
-                    with open(meta_file, 'r') as f:
-                        metadata = json.load(f)
-                    faces.append({
-                        'id': metadata['face_id'],
-                        'file': face_file.name,
-                        'timestamp': datetime.fromisoformat(metadata['timestamp'])
-                    })
-            return faces
+            with self._index_lock:
+                db = self.sync_unknown_index()
+                rows = db.execute(
+                    "SELECT face_id, file, ts FROM unknown "
+                    "WHERE meta_file IS NOT NULL ORDER BY ts"
+                ).fetchall()
+            return [{
+                'id': face_id,
+                'file': file,
+                'timestamp': datetime.fromtimestamp(ts)
+            } for face_id, file, ts in rows]
         except Exception as e:
             self.logger.error(f"Error listing unknown faces: {e}")
             return []
@@ -245,34 +656,57 @@ class FaceManager:
             if not new_name:
                 raise ValueError("Invalid name")
             
-            # Find unknown face files
-            face_file = None
-            meta_file = None
-            for f in self.unknown_faces_dir.glob(f"*{face_id}*.jpg"):
-                face_file = f
-                meta_file = self.unknown_faces_dir / f"{f.stem}_meta.json"
-                break
-            
-            if not face_file or not meta_file.exists():
+            # Find unknown face files: an exact ID, or else a unique ID prefix
+            # (a range scan on the primary key, not a directory walk)
+            with self._index_lock:
+                db = self.sync_unknown_index()
+                rows = db.execute(
+                    "SELECT face_id, file, meta_file FROM unknown WHERE face_id = ?", (face_id,)
+                ).fetchall()
+                if not rows and face_id:
+                    rows = db.execute(
+                        "SELECT face_id, file, meta_file FROM unknown "
+                        "WHERE face_id >= ? AND face_id < ? LIMIT 2",
+                        (face_id, face_id + '\uffff')
+                    ).fetchall()
+            
+            if len(rows) > 1:
+                raise ValueError(f"Unknown face ID {face_id} is ambiguous")
+            if not rows or not rows[0][2]:
                 raise ValueError(f"Unknown face {face_id} not found")
+            face_id, file, meta_name = rows[0]
+            face_file = self.unknown_faces_dir / file
+            meta_file = self.unknown_faces_dir / meta_name
+            
+            if self.find_known_face(new_name):
+                raise ValueError(f"Face with name '{new_name}' already exists")
             
             # Validate face image
-            if not self.validate_image(str(face_file)):
+            try:
+                encoding = self.analyze_image(str(face_file), encode=self.shares_encodings())
+            except Exception as e:
+                self.logger.error(f"Image validation failed: {e}")
                 raise ValueError("Face image validation failed")
             
             # Copy to known faces
             new_path = self.known_faces_dir / f"{new_name}.jpg"
-            shutil.copy2(face_file, new_path)
+            self._install_known_file(str(face_file), new_path)
+            self.store_encoding(new_path, encoding)
             
             # Update metadata
-            with open(meta_file, 'r') as f:
-                metadata = json.load(f)
+            metadata = load_json(meta_file)
             metadata['promoted'] = {
                 'timestamp': datetime.now().isoformat(),
                 'new_name': new_name
             }
-            with open(meta_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            dump_json(metadata, meta_file)
+            with self._index_lock:
+                db = self._unknown_index()
+                db.execute(
+                    "UPDATE unknown SET promoted_json = ? WHERE face_id = ?",
+                    (dumps_json(metadata['promoted']), face_id)
+                )
+                db.commit()
             
             self.logger.info(f"Promoted {face_id} to {new_name}")
             return True
@@ -292,26 +726,41 @@ class FaceManager:
             int: Number of faces removed
         """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days_old)
-            cleaned_count = 0
-            
-            for face_file in self.unknown_faces_dir.glob('unknown_*.jpg'):
-                meta_file = self.unknown_faces_dir / f"{face_file.stem}_meta.json"
+            cutoff = (datetime.now() - timedelta(days=days_old)).timestamp()
+            
+            # ts is the image mtime taken from scandir, so no sidecar is read
+            with self._index_lock:
+                db = self.sync_unknown_index()
+                rows = db.execute(
+                    "SELECT face_id, file, meta_file FROM unknown WHERE ts < ?", (cutoff,)
+                ).fetchall()
+                for face_id, file, meta_file in rows:
+                    # face_recognition.py also keeps the encoding (or its
+                    # encrypted token) in a sidecar of its own
+                    for name in (file, meta_file, f"{face_id}_encoding.npy", f"{face_id}_encoding.enc"):
+                        if name:
+                            try:
+                                os.unlink(os.path.join(self.unknown_faces_dir, name))
+                            except FileNotFoundError:
+                                pass
+                db.execute("DELETE FROM unknown WHERE ts < ?", (cutoff,))
+                db.commit()
                 
-                if meta_file.exists():
-                    with open(meta_file, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    timestamp = datetime.fromisoformat(metadata['timestamp'])
-                    if timestamp < cutoff_date:
-                        face_file.unlink()
-                        meta_file.unlink()
-                        cleaned_count += 1
-                else:
-                    # If no metadata, use file timestamp
-                    if datetime.fromtimestamp(face_file.stat().st_mtime) < cutoff_date:
-                        face_file.unlink()
-                        cleaned_count += 1
+                # Sweep old sidecars whose image is already gone, e.g. left
+                # behind by earlier cleanups
+                indexed = {row[0] for row in db.execute("SELECT face_id FROM unknown")}
+                with os.scandir(self.unknown_faces_dir) as it:
+                    for entry in it:
+                        if (entry.name.startswith('unknown_') or
+                                not entry.name.endswith(('_meta.json', '_encoding.npy', '_encoding.enc'))):
+                            continue
+                        if (entry.name.split('_', 1)[0] not in indexed and
+                                entry.stat().st_mtime < cutoff):
+                            try:
+                                os.unlink(entry.path)
+                            except FileNotFoundError:
+                                pass
+            cleaned_count = len(rows)
             
             self.logger.info(f"Cleaned {cleaned_count} old unknown faces")
             return cleaned_count
@@ -333,22 +782,19 @@ class FaceManager:
             backup_dir.mkdir(parents=True, exist_ok=True)
             
             # Backup known faces
-            known_backup = backup_dir / 'known_faces'
-            shutil.copytree(self.known_faces_dir, known_backup)
+            known_count = self._link_tree(self.known_faces_dir, backup_dir / 'known_faces')
             
             # Backup unknown faces
-            unknown_backup = backup_dir / 'unknown_faces'
-            shutil.copytree(self.unknown_faces_dir, unknown_backup)
+            unknown_count = self._link_tree(self.unknown_faces_dir, backup_dir / 'unknown_faces')
             
             # Create backup info
             backup_info = {
                 'timestamp': timestamp,
-                'known_faces': len(list(known_backup.glob('*.*'))),
-                'unknown_faces': len(list(unknown_backup.glob('*.*')))
+                'known_faces': known_count,
+                'unknown_faces': unknown_count
             }
             
-            with open(backup_dir / 'backup_info.json', 'w') as f:
-                json.dump(backup_info, f, indent=2)
+            dump_json(backup_info, backup_dir / 'backup_info.json')
             
             self.logger.info(f"Backup created: {timestamp}")
             return True
@@ -357,6 +803,39 @@ class FaceManager:
             self.logger.error(f"Error creating backup: {e}")
             return False
     
+    @staticmethod
+    def _link_tree(src, dst):
+        """
+        Mirror a directory by hardlinking its files
+        
+        Parameters:
+            src (Path): Directory to back up
+            dst (Path): Destination directory (created)
+            
+        Returns:
+            int: Number of files backed up
+        """
+        os.makedirs(dst)
+        count = 0
+        with os.scandir(src) as it:
+            for entry in it:
+                target = os.path.join(dst, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    count += FaceManager._link_tree(entry.path, target)
+                    continue
+                # Metadata is rewritten in place (e.g. on promotion), which
+                # would change a hardlinked backup too, so copy it instead
+                if entry.name.endswith('.json'):
+                    shutil.copy2(entry.path, target)
+                else:
+                    try:
+                        os.link(entry.path, target)
+                    except OSError:
+                        # Different filesystem or no hardlink support
+                        shutil.copy2(entry.path, target)
+                count += 1
+        return count
+    
     @staticmethod
     def sanitize_name(name):
         """
@@ -369,9 +848,32 @@ class FaceManager:
             str: Sanitized name string
         """
         # Remove special characters and extra spaces
-        name = ''.join(c for c in name if c.isalnum() or c in (' ', '-', '_'))
-        name = ' '.join(name.split())  # Normalize spaces
-        return name.strip()
+        if name.isascii():
+            name = name.translate(_NAME_TRANS)
+        else:
+            name = _NAME_STRIP_RE.sub('', name)
+        return ' '.join(name.split())  # Normalize spaces
+
+# Manager used by run_task; each worker process builds its own rather than
+# sharing the parent's SQLite connection across fork
+_task_manager = None
+
+def run_task(method, *args):
+    """
+    Run a FaceManager method in a worker process
+    
+    Parameters:
+        method (str): FaceManager method name (e.g. 'add_face')
+        *args: Arguments for the method
+        
+    Returns:
+        The method's return value
+    """
+    global _task_manager
+    # read_config returns the same object until config.yml changes
+    if _task_manager is None or _task_manager.config is not read_config('config.yml'):
+        _task_manager = FaceManager()
+    return getattr(_task_manager, method)(*args)
 
 @click.group()
 def cli():
@@ -5,21 +5,32 @@ Provides a web-based interface for managing faces and system settings
 """
 
 import os
+import io
+import hashlib
+import mimetypes
 import yaml
-import json
 import logging
+import time
+import uuid
+import tempfile
+from urllib.parse import quote
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, send_from_directory, abort
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
+from concurrent.futures import ProcessPoolExecutor
 from logging.handlers import RotatingFileHandler
+from manage_faces import FaceManager, read_config, run_task, load_json, dump_json
+
+try:
+    import orjson  # Optional: faster API response serialization
+except ImportError:
+    orjson = None
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = os.urandom(24)
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Initialize login manager
@@ -34,11 +45,59 @@ class User(UserMixin):
 
 # Load configuration
 def load_config():
-    with open('config.yml', 'r') as f:
-        return yaml.safe_load(f)
+    return read_config('config.yml')
 
 config = load_config()
 
+def load_secret_key():
+    """Load the session signing key, creating it on first run"""
+    # Persisted so restarts do not invalidate every login session
+    key_file = Path(config['storage']['base_dir']) / 'web_secret.key'
+    if key_file.exists():
+        return key_file.read_bytes()
+    key = os.urandom(32)
+    key_file.parent.mkdir(parents=True, exist_ok=True)
+    # Gunicorn workers may race on first start: write the key in full to a
+    # private temp file, then link it into place. Only one link succeeds and
+    # readers never see a partial key; the losers use the winner's key.
+    fd, tmp_path = tempfile.mkstemp(dir=key_file.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        os.link(tmp_path, key_file)
+    except FileExistsError:
+        key = key_file.read_bytes()
+    finally:
+        os.unlink(tmp_path)
+    return key
+
+app.config['SECRET_KEY'] = load_secret_key()
+
+# Shared face manager; constructing one reloads config and logging setup
+face_manager = FaceManager()
+
+# Adding and promoting faces runs HOG detection, hundreds of ms on a Pi;
+# worker processes keep request threads free and validate uploads in
+# parallel. Task state is kept as files in TASKS_DIR so any web worker
+# process can answer a poll, and is pruned after TASK_RETENTION seconds.
+task_pool = ProcessPoolExecutor(max_workers=2)
+TASK_RETENTION = 600
+TASKS_DIR = Path(config['storage']['base_dir']) / 'tasks'
+
+# Uploads accepted by api_add_face, and markers (named by content hash) of
+# images already registered, so identical re-uploads skip decoding. A marker
+# holds the name plus the stored image's mtime and size, so it stops
+# matching once that image is removed or replaced
+UPLOAD_MIMETYPES = ('image/jpeg', 'image/png')
+UPLOAD_HASHES_DIR = Path(config['storage']['base_dir']) / 'upload_hashes'
+
+# Dashboards poll the stats endpoint every second or so; serve them from a
+# short-lived snapshot instead of re-probing psutil, the disk and the camera
+STATS_TTL = 3.0
+CAMERA_STATUS_TTL = 10.0
+_stats_cache = {'ts': 0.0, 'data': None}
+_camera_cache = {'ts': 0.0, 'status': False}
+
 # Setup logging
 logger = logging.getLogger('WebInterface')
 logger.setLevel(logging.INFO)
@@ -52,9 +111,6 @@ handler.setFormatter(logging.Formatter(
 ))
 logger.addHandler(handler)
 
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 @login_manager.user_loader
 def load_user(user_id):
     if user_id == config['web_interface']['username']:
@@ -107,6 +163,18 @@ def unknown_faces():
     faces = list_unknown_faces()
     return render_template('unknown_faces.html', faces=faces)
 
+@app.route('/faces/known/<path:filename>')
+@login_required
+def known_face_image(filename):
+    """Known face image"""
+    return send_face_image(config['storage']['known_faces_dir'], 'known', filename)
+
+@app.route('/faces/unknown/<path:filename>')
+@login_required
+def unknown_face_image(filename):
+    """Unknown face image"""
+    return send_face_image(config['storage']['unknown_faces_dir'], 'unknown', filename)
+
 @app.route('/settings')
 @login_required
 def settings():
@@ -117,15 +185,15 @@ def settings():
 @login_required
 def api_known_faces():
     """API endpoint for known faces"""
-    faces = list_known_faces()
-    return jsonify(faces)
+    etag = format(os.stat(config['storage']['known_faces_dir']).st_mtime_ns, 'x')
+    return conditional_json(etag, None, list_known_faces)
 
 @app.route('/api/faces/unknown', methods=['GET'])
 @login_required
 def api_unknown_faces():
     """API endpoint for unknown faces"""
-    faces = list_unknown_faces()
-    return jsonify(faces)
+    etag = format(os.stat(config['storage']['unknown_faces_dir']).st_mtime_ns, 'x')
+    return conditional_json(etag, None, list_unknown_faces)
 
 @app.route('/api/faces/add', methods=['POST'])
 @login_required
@@ -144,24 +212,46 @@ def api_add_face():
         if image.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         
-        if not allowed_file(image.filename):
+        if not allowed_file(image.filename) or image.mimetype not in UPLOAD_MIMETYPES:
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Save uploaded file
-        filename = secure_filename(image.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        image.save(filepath)
-        
-        # Add face
-        success = add_face(name, filepath)
+        # Hash while reading the upload so a repeat of an image that is
+        # already registered is answered without decoding it again
+        digest = hashlib.blake2b(digest_size=16)
+        buf = io.BytesIO()
+        for chunk in iter(lambda: image.stream.read(65536), b''):
+            digest.update(chunk)
+            buf.write(chunk)
+        # The same image under the same name is answered with the existing
+        # record; under another name it is registered again as usual
+        marker = UPLOAD_HASHES_DIR / digest.hexdigest()
+        registered_as = registered_upload(marker)
+        if registered_as and registered_as == face_manager.sanitize_name(name):
+            return jsonify({
+                'message': f"Image already registered as '{registered_as}'",
+                'name': registered_as,
+                'encoded': registered_as in face_manager.get_encodings()
+            })
         
-        # Clean up upload
-        os.remove(filepath)
+        def remember_upload(future):
+            if future.exception() is None and future.result():
+                registered = face_manager.sanitize_name(name)
+                face_file = face_manager.find_known_face(registered)
+                if face_file:
+                    stat = face_file.stat()
+                    UPLOAD_HASHES_DIR.mkdir(parents=True, exist_ok=True)
+                    marker.write_text(f"{registered}\n{stat.st_mtime_ns}\n{stat.st_size}")
         
-        if success:
-            return jsonify({'message': 'Face added successfully'})
-        else:
-            return jsonify({'error': 'Failed to add face'}), 500
+        # Validate straight from memory; nothing touches the disk unless
+        # the image is accepted
+        filename = secure_filename(image.filename)
+        file_ext = os.path.splitext(filename)[1].lower()
+        task_id = submit_task(
+            'add_face', (name, buf.getvalue(), file_ext),
+            'Face added successfully', 'Failed to add face',
+            on_done=remember_upload
+        )
+        return jsonify({'task_id': task_id}), 202
             
     except Exception as e:
         logger.error(f"Error adding face: {e}")
@@ -196,15 +286,28 @@ def api_promote_face():
         if not face_id or not new_name:
             return jsonify({'error': 'Missing required parameters'}), 400
         
-        if promote_unknown_face(face_id, new_name):
-            return jsonify({'message': 'Face promoted successfully'})
-        else:
-            return jsonify({'error': 'Failed to promote face'}), 500
+        task_id = submit_task(
+            'promote_unknown_face', (face_id, new_name),
+            'Face promoted successfully', 'Failed to promote face'
+        )
+        return jsonify({'task_id': task_id}), 202
             
     except Exception as e:
         logger.error(f"Error promoting face: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/tasks/<task_id>', methods=['GET'])
+@login_required
+def api_task_status(task_id):
+    """API endpoint for the state of a background face task"""
+    # Task IDs are uuid4 hex; anything else never names a task file
+    if len(task_id) != 32 or not all(c in '0123456789abcdef' for c in task_id):
+        return jsonify({'error': 'Unknown task'}), 404
+    try:
+        return jsonify(load_json(TASKS_DIR / f"{task_id}.json"))
+    except FileNotFoundError:
+        return jsonify({'error': 'Unknown task'}), 404
+
 @app.route('/api/settings', methods=['POST'])
 @login_required
 def api_update_settings():
@@ -224,75 +327,149 @@ def api_update_settings():
 @login_required
 def api_system_stats():
     """API endpoint for system statistics"""
-    return jsonify(get_system_stats())
+    stats = get_system_stats()
+    return conditional_json(stats.get('last_updated', ''), int(STATS_TTL), lambda: stats)
+
+def conditional_json(etag, max_age, build):
+    """
+    Build a JSON response that honours If-None-Match
+    
+    The ETag tracks the underlying data (directory mtime or stats snapshot),
+    so a matching client gets a bare 304 without the listing being built or
+    serialized. With max_age None the browser revalidates on every request,
+    so a listing is never stale after the page reloads on a finished task.
+    """
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    elif orjson is not None:
+        # orjson emits bytes directly, several times faster than jsonify
+        response = app.response_class(orjson.dumps(build()), mimetype='application/json')
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Login-protected data: browsers may cache it, shared proxies may not
+    response.cache_control.private = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+    return response
+
+def send_face_image(directory, kind, filename):
+    """
+    Send a face image once the session has been checked
+    
+    With web_interface.x_accel_prefix set, nginx serves the file from its
+    internal location with sendfile(2); otherwise Flask sends it with
+    conditional (ETag/304) support. Known face URLs carry the image mtime as
+    ?v=, so the hour-long max-age never outlives a re-registered photo.
+    """
+    if safe_join(directory, filename) is None:
+        abort(404)
+    
+    accel_prefix = config['web_interface'].get('x_accel_prefix')
+    if accel_prefix:
+        response = make_response('')
+        # nginx decodes the URI; raw spaces or non-ASCII break the header
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{kind}/{quote(filename)}"
+        response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        response = send_from_directory(directory, filename, conditional=True, max_age=3600)
+    response.cache_control.private = True
+    return response
 
 def allowed_file(filename):
     """Check if file type is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}
 
+def registered_upload(marker):
+    """Return the name an identical upload is still registered under, if any"""
+    try:
+        name, mtime_ns, size = marker.read_text().split('\n')
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        name = None
+    face_file = name and face_manager.find_known_face(name)
+    if face_file:
+        stat = face_file.stat()
+        if (str(stat.st_mtime_ns), str(stat.st_size)) == (mtime_ns, size):
+            return name
+    # The face was removed or re-registered with another image since;
+    # forget the stale marker
+    try:
+        marker.unlink()
+    except FileNotFoundError:
+        pass
+    return None
+
 def list_known_faces():
     """List all known faces"""
-    faces = []
-    known_faces_dir = Path(config['storage']['known_faces_dir'])
-    
-    for face_file in sorted(known_faces_dir.glob('*.*')):
-        if face_file.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-            faces.append({
-                'name': face_file.stem,
-                'file': face_file.name,
-                'added': datetime.fromtimestamp(face_file.stat().st_mtime).isoformat()
-            })
-    
-    return faces
+    faces = face_manager.list_known_faces()
+    return [dict(face, added=face['added'].isoformat()) for face in faces]
 
 def list_unknown_faces():
     """List all unknown faces"""
-    faces = []
-    unknown_faces_dir = Path(config['storage']['unknown_faces_dir'])
+    faces = face_manager.list_unknown_faces()
+    return [dict(face, timestamp=face['timestamp'].isoformat()) for face in faces]
+
+def submit_task(method, args, success, failure, on_done=None):
+    """
+    Queue a FaceManager method on the worker pool
     
-    for face_file in sorted(unknown_faces_dir.glob('unknown_*.jpg')):
-        meta_file = unknown_faces_dir / f"{face_file.stem}_meta.json"
-        if meta_file.exists():
-            with open(meta_file, 'r') as f:
-                metadata = json.load(f)
-            faces.append({
-                'id': metadata['face_id'],
-                'file': face_file.name,
-                'timestamp': metadata['timestamp']
-            })
+    Parameters:
+        method (str): FaceManager method name
+        args (tuple): Arguments for the method
+        success (str): Message reported when the method returns True
+        failure (str): Error reported otherwise
+        on_done (callable): Optional callback receiving the finished future
+        
+    Returns:
+        str: Task ID for /api/tasks/<task_id>
+    """
+    TASKS_DIR.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - TASK_RETENTION
+    with os.scandir(TASKS_DIR) as it:
+        for entry in it:
+            if entry.stat().st_mtime < cutoff:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
     
-    return faces
-
-def add_face(name, image_path):
-    """Add a new known face"""
-    try:
-        from manage_faces import FaceManager
-        manager = FaceManager()
-        return manager.add_face(name, image_path)
-    except Exception as e:
-        logger.error(f"Error adding face: {e}")
-        return False
+    task_id = uuid.uuid4().hex
+    task_file = TASKS_DIR / f"{task_id}.json"
+    write_task_state(task_file, {'status': 'pending'})
+    
+    def record_result(future):
+        error = future.exception()
+        if error is None and future.result():
+            write_task_state(task_file, {'status': 'done', 'message': success})
+        else:
+            if error is not None:
+                logger.error(f"Face task {task_id} failed: {error}")
+            write_task_state(task_file, {'status': 'failed', 'error': failure})
+    
+    future = task_pool.submit(run_task, method, *args)
+    future.add_done_callback(record_result)
+    if on_done is not None:
+        future.add_done_callback(on_done)
+    return task_id
+
+def write_task_state(task_file, state):
+    """Replace a task's state file so readers never see a partial write"""
+    tmp_file = task_file.with_name(task_file.name + '.tmp')
+    dump_json(state, tmp_file)
+    os.replace(tmp_file, task_file)
 
 def remove_face(name):
     """Remove a known face"""
     try:
-        from manage_faces import FaceManager
-        manager = FaceManager()
-        return manager.remove_face(name)
+        return face_manager.remove_face(name)
     except Exception as e:
         logger.error(f"Error removing face: {e}")
         return False
 
-def promote_unknown_face(face_id, new_name):
-    """Promote unknown face to known face"""
-    try:
-        from manage_faces import FaceManager
-        manager = FaceManager()
-        return manager.promote_unknown_face(face_id, new_name)
-    except Exception as e:
-        logger.error(f"Error promoting face: {e}")
-        return False
-
 def update_settings(new_settings):
     """Update system settings"""
     try:
@@ -308,6 +485,10 @@ def update_settings(new_settings):
         with open('config.yml', 'w') as f:
             yaml.dump(config, f, default_flow_style=False)
         
+        # Keep the shared manager in step with the new settings
+        face_manager.load_config()
+        face_manager.setup_paths()
+        
         return True
     except Exception as e:
         logger.error(f"Error updating settings: {e}")
@@ -327,6 +508,9 @@ def validate_settings(settings):
 
 def get_system_stats():
     """Get system statistics"""
+    now = time.monotonic()
+    if _stats_cache['data'] is not None and now - _stats_cache['ts'] < STATS_TTL:
+        return _stats_cache['data']
     try:
         import psutil
         
@@ -342,7 +526,7 @@ def get_system_stats():
         # Camera status
         camera_active = check_camera_status()
         
-        return {
+        stats = {
             'cpu_percent': cpu_percent,
             'memory_percent': memory.percent,
             'disk_percent': disk.percent,
@@ -351,20 +535,35 @@ def get_system_stats():
             'camera_active': camera_active,
             'last_updated': datetime.now().isoformat()
         }
+        _stats_cache.update(ts=now, data=stats)
+        return stats
     except Exception as e:
         logger.error(f"Error getting system stats: {e}")
         return {}
 
 def check_camera_status():
     """Check if camera is active"""
+    now = time.monotonic()
+    if now - _camera_cache['ts'] < CAMERA_STATUS_TTL:
+        return _camera_cache['status']
+    
+    device = config['camera']['device']
+    sysfs_node = f"/sys/class/video4linux/video{device}"
     try:
-        import cv2
-        cap = cv2.VideoCapture(config['camera']['device'])
-        status = cap.isOpened()
-        cap.release()
-        return status
+        if isinstance(device, int) and os.path.isdir('/sys/class/video4linux'):
+            # The kernel lists the device without us opening it, which takes
+            # hundreds of ms and contends with the recognition process
+            status = os.path.exists(sysfs_node)
+        else:
+            import cv2
+            cap = cv2.VideoCapture(device)
+            status = cap.isOpened()
+            cap.release()
     except Exception:
-        return False
+        status = False
+    
+    _camera_cache.update(ts=now, status=status)
+    return status
 
 if __name__ == '__main__':
     # Run the application